@@ -8,8 +8,7 @@ defined requirements
 
 import csv
 import re
-from validate_email import validate_email
-from utils.customLogger import custom_logger as cl
+from utils.customLogger import LazyLogger
 import logging
 
 
@@ -20,7 +19,7 @@ class ReadInputData:
     Class to read Persons raw data from a csv file and return the output as a list
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
 
     def read_data(self) -> list:
         """
@@ -50,7 +49,7 @@ class FilterFields:
     and returns list items where each item is a list consisting of a person's first_name and last_name
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
 
     def get_first_1000_records_max(self, data) -> list:
         """
@@ -183,6 +182,7 @@ class FilterFields:
         ..note:: filters following email which are valid as per https://en.wikipedia.org/wiki/Email_address
         " "@example.org,  "john..doe"@example.org
         """
+        from validate_email import validate_email  # Imported on first use, it loads smtplib and networking modules
         data_with_valid_email_format = []
         for row in data:
             local_part = row[-1].split('@')[0]
@@ -236,7 +236,7 @@ class RelatedPersons:
     defined in requirements document
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
 
     def get_lastname_that_is_same_as_lastname_of_another(self, lastname: str, another_lastname: str) -> bool:
         """
@@ -292,9 +292,11 @@ class RelatedPersons:
         else:
             return False
 
-    def get_related_names_data(self) -> list:
+    def get_related_names_data(self, data: list = None) -> list:
         """
         Call the search pattern functions above and returns a list of related persons
+        :param data: list of items. Each item is a list consisting of first_name, last_name
+        The filtered records of the input csv file are used when not given
         :return: list
         each list contains a dictionary.
         In each dictionary:
@@ -302,7 +304,8 @@ class RelatedPersons:
             value: list of persons with first_name, last_name whose last_name matches with last_name in the key person
         as per requirements
         """
-        data = FilterFields().get_filtered_first_lastname_details()
+        if data is None:
+            data = FilterFields().get_filtered_first_lastname_details()
         related_names = []
         for i in range(0, len(data)):
             row = {}
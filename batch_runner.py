@@ -0,0 +1,140 @@
+import csv
+import os
+import time
+from utils.customLogger import LazyLogger
+import logging
+from filter_fields import FilterFields
+from format_and_write_relatednames_to_file import FormatAndWriteRelatedNamesToAFile
+
+# Writer of a batch worker, created once per process by _init_batch_worker
+_worker_writer = None
+# NameNormaliser of a batch worker, its caches are kept across the jobs of the worker
+_worker_name_normaliser = None
+
+
+def _init_batch_worker(name_normaliser=None):
+    """
+    Warms up a worker process once: imports the libraries loaded on first use and compiles their patterns,
+    so the jobs of the worker do not pay for them
+    """
+    global _worker_writer, _worker_name_normaliser
+    from toolz import functoolz  # noqa: F401  Used by FilterFields.get_filtered_first_lastname_details
+    FilterFields.is_valid_email('warm.up@example.com')
+    _worker_writer = FormatAndWriteRelatedNamesToAFile()
+    _worker_name_normaliser = name_normaliser
+
+
+def _run_job(job: tuple) -> dict:
+    """
+    :param job: tuple (input file path, output file path)
+    :return: dict of the job result, ex: {"input": "a.csv", "output": "a.txt", "seconds": 0.01, "error": None, "pid": 1}
+    """
+    input_file_path, output_file_path = job
+    start_time = time.perf_counter()
+    error = None
+    try:
+        if not os.path.isfile(input_file_path):
+            raise IOError(f'Input file {input_file_path} not found')
+        if not _worker_writer.write_related_names_data_to_text_file(input_file_path=input_file_path,
+                                                                    output_file_path=output_file_path,
+                                                                    name_normaliser=_worker_name_normaliser):
+            raise IOError(f'Unable to write output file {output_file_path}')
+    except Exception as exception:
+        error = f'{type(exception).__name__}: {exception}'
+    return {'input': input_file_path, 'output': output_file_path, 'seconds': time.perf_counter() - start_time,
+            'error': error, 'pid': os.getpid()}
+
+
+# Runs many small related persons jobs, one input and output file each, on a pool of warmed up worker processes
+class BatchRunner:
+    """
+    BatchRunner class reads a manifest csv file of "input file path,output file path" rows
+    and spreads the jobs over a pool of worker processes started once for the whole batch.
+    Interpreter startup, imports, logger setup and validator warm up are paid once per worker instead of once per job,
+    the name normalisation caches are shared by the jobs of a worker.
+    Every job writes the same output as a run of RelatedPersonsSolution2.py on its input file.
+    Timings of every job and the total wall time are logged, and written to a report csv file when asked
+
+    Usage:
+        BatchRunner(manifest_path='./manifest.csv', processes=4).run(report_file_path='batch_report.csv')
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    REPORT_FIELDS = ['input', 'output', 'seconds', 'error', 'pid']
+
+    def __init__(self, manifest_path: str = None, jobs: list = None, processes: int = None, name_normaliser=None):
+        """
+        :param manifest_path: string  path of the manifest csv file, relative paths are relative to its directory
+        :param jobs: list of tuples (input file path, output file path), used when manifest_path is not given
+        :param processes: int  number of worker processes, the number of CPUs when not given.
+        0 runs the jobs one after another in this process, warmed up the same way
+        :param name_normaliser: NameNormaliser  accepts and matches international names when given
+        """
+        self.manifest_path = manifest_path
+        self.jobs = jobs
+        self.processes = (os.cpu_count() or 1) if processes is None else processes
+        self.name_normaliser = name_normaliser
+
+    def get_jobs(self) -> list:
+        """
+        :return: list of tuples (input file path, output file path). Blank rows and rows starting with # are skipped
+        """
+        if self.manifest_path is None:
+            return list(self.jobs or [])
+        base_dir = os.path.dirname(os.path.abspath(self.manifest_path))
+        jobs = []
+        with open(self.manifest_path, newline='') as manifest_file:
+            for line_number, row in enumerate(csv.reader(manifest_file), start=1):
+                if not row or not row[0].strip() or row[0].lstrip().startswith('#'):
+                    continue
+                if len(row) != 2:
+                    self.log.error(msg=f'Manifest line {line_number} does not have an input and an output file path')
+                    continue
+                jobs.append(tuple(os.path.join(base_dir, path.strip()) for path in row))
+        return jobs
+
+    def iter_results(self, jobs: list):
+        """
+        Generator function which runs the jobs and returns their results in the order they complete
+
+        :param jobs: list of tuples (input file path, output file path)
+        :return: dict (received from _run_job)
+        """
+        if self.processes == 0 or len(jobs) <= 1:
+            _init_batch_worker(self.name_normaliser)
+            yield from map(_run_job, jobs)
+            return
+        from multiprocessing import Pool
+        with Pool(processes=min(self.processes, len(jobs)), initializer=_init_batch_worker,
+                  initargs=(self.name_normaliser,)) as pool:
+            yield from pool.imap_unordered(_run_job, jobs)
+
+    def run(self, report_file_path: str = None) -> list:
+        """
+        :param report_file_path: string  csv file of the timing and error of every job, not written when not given
+        :return: list of dicts (received from _run_job) in the order the jobs completed
+        """
+        try:
+            jobs = self.get_jobs()
+        except IOError:
+            self.log.error(msg='Unable to access manifest file')
+            return []
+        start_time = time.perf_counter()
+        results = []
+        for result in self.iter_results(jobs=jobs):
+            results.append(result)
+            if result['error'] is None:
+                self.log.info(msg=f'{result["input"]} -> {result["output"]} in {result["seconds"] * 1000:.1f} ms')
+            else:
+                self.log.error(msg=f'{result["input"]} failed: {result["error"]}')
+        wall_seconds = time.perf_counter() - start_time
+        failed = sum(result['error'] is not None for result in results)
+        self.log.info(msg=f'{len(results) - failed} of {len(jobs)} jobs succeeded in {wall_seconds:.2f} s wall time, '
+                          f'{sum(result["seconds"] for result in results):.2f} s in jobs')
+        if report_file_path:
+            with open(report_file_path, 'w', newline='') as report_file:
+                writer = csv.DictWriter(report_file, fieldnames=self.REPORT_FIELDS)
+                writer.writeheader()
+                writer.writerows(results)
+        return results
@@ -0,0 +1,60 @@
+"""
+Compares running many small jobs as one 'python RelatedPersonsSolution2.py' process each
+with running them on the warm worker pool of BatchRunner, and checks the outputs are the same
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_runner [--jobs 50] [--persons 200] [--processes N]
+"""
+
+import argparse
+import filecmp
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from batch_runner import BatchRunner
+from benchmarks.generate_persons_data import write_persons_csv
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--jobs', type=int, default=50, help='number of input files')
+    parser.add_argument('--persons', type=int, default=200, help='persons per input file')
+    parser.add_argument('--processes', type=int, help='worker processes of the pool, the number of CPUs when not given')
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    repository_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    with tempfile.TemporaryDirectory() as work_dir:
+        input_file_paths = [write_persons_csv(file_path=os.path.join(work_dir, f'tenant{job}.csv'),
+                                              count=args.persons, seed=job, surnames=args.persons // 4)
+                            for job in range(args.jobs)]
+
+        start_time = time.perf_counter()
+        for input_file_path in input_file_paths:
+            subprocess.run([sys.executable, os.path.join(repository_dir, 'RelatedPersonsSolution2.py'),
+                            '--input', input_file_path, '--output', f'{input_file_path}.process.txt'],
+                           check=True, capture_output=True)
+        process_per_job_seconds = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        results = BatchRunner(jobs=[(path, f'{path}.batch.txt') for path in input_file_paths],
+                              processes=args.processes).run()
+        batch_seconds = time.perf_counter() - start_time
+
+        failed = [result['input'] for result in results if result['error'] is not None]
+        different = [path for path in input_file_paths
+                     if not filecmp.cmp(f'{path}.process.txt', f'{path}.batch.txt', shallow=False)]
+    print(f'process per job: {process_per_job_seconds:.2f} s, '
+          f'{process_per_job_seconds / args.jobs * 1000:.1f} ms per job')
+    print(f'batch runner:    {batch_seconds:.2f} s, {batch_seconds / args.jobs * 1000:.1f} ms per job, '
+          f'{process_per_job_seconds / batch_seconds:.1f}x faster')
+    if failed or different:
+        sys.exit(f'{len(failed)} jobs failed, {len(different)} outputs differ')
+
+
+if __name__ == "__main__":
+    main()
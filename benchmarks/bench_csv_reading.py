@@ -0,0 +1,57 @@
+"""
+Compares reading the persons csv file with 'csv' library against the memory mapped byte scanner
+Both read all the records, filter the records with long fields and keep first_name, last_name and email
+Reports the throughput in MB/s
+
+Run from the repository root:
+    python -m benchmarks.bench_csv_reading [number of persons]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+from benchmarks.generate_persons_data import write_persons_csv
+from filter_fields import FilterFields
+from get_first_n_records_from_csv import GetFirstNRecordsFromCSVFile
+
+
+def read_with_csv_library(file_path: str, count: int) -> list:
+    data = GetFirstNRecordsFromCSVFile().get_first_n_records(count=count, file_path=file_path)
+    data = FilterFields().get_data_with_fields_length_less_than_257(data=data)
+    return FilterFields().get_data_with_only_first_lastname_email(data=data)
+
+
+def read_with_mmap(file_path: str, count: int) -> list:
+    return GetFirstNRecordsFromCSVFile().get_first_n_projected_records_from_mmap(count=count, file_path=file_path)
+
+
+def measure(read_function, file_path: str, count: int, repeat: int = 3) -> tuple:
+    """
+    :return: tuple (best time in seconds, records read)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        records = read_function(file_path, count)
+        timings.append(time.perf_counter() - start)
+    return min(timings), records
+
+
+def main(count: int = 200000):
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = write_persons_csv(file_path=os.path.join(temp_dir, 'persons.csv'), count=count)
+        size_mb = os.path.getsize(file_path) / 1e6
+        csv_time, csv_records = measure(read_with_csv_library, file_path, count)
+        mmap_time, mmap_records = measure(read_with_mmap, file_path, count)
+    if csv_records != mmap_records:
+        sys.exit('Memory mapped reader returned different records')
+    print(f'{count} records, {size_mb:.1f} MB')
+    print(f'csv library: {csv_time:.3f}s {size_mb / csv_time:.1f} MB/s')
+    print(f'mmap       : {mmap_time:.3f}s {size_mb / mmap_time:.1f} MB/s ({csv_time / mmap_time:.2f}x)')
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
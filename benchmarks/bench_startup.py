@@ -0,0 +1,59 @@
+"""
+Measures the import time of the command line entry points with 'python -X importtime'
+and checks it against a budget. Heavy dependencies must not be imported at startup
+
+Run from the repository root:
+    python -m benchmarks.bench_startup [--budget-ms 50] [--runs 5]
+Exits with an error when an entry point is over the budget or imports a heavy dependency
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+
+ENTRY_POINTS = ['RelatedPersonsSolution2', 'format_and_write_relatednames_to_file']
+# Loaded on first use only
+HEAVY_MODULES = ['validate_email', 'toolz', 'smtplib', 'inspect', 'argparse']
+
+
+def get_import_times(module: str) -> dict:
+    """
+    Imports the module in a fresh interpreter
+
+    :param module: string  module name, ex: "RelatedPersonsSolution2"
+    :return: dict with imported module names as keys and cumulative import time in microseconds as values
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, check=True)
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        import_times[name.strip()] = int(cumulative)
+    return import_times
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=50.0, help='maximum import time of an entry point')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreters per entry point')
+    args = parser.parse_args(argv)
+
+    failures = []
+    for module in ENTRY_POINTS:
+        runs = [get_import_times(module) for _ in range(args.runs)]
+        import_time_ms = statistics.median(run[module] for run in runs) / 1000
+        heavy_modules = [name for name in HEAVY_MODULES if name in runs[0]]
+        print(f'{module}: {import_time_ms:.1f} ms (budget {args.budget_ms:.1f} ms)')
+        if import_time_ms > args.budget_ms:
+            failures.append(f'{module} takes {import_time_ms:.1f} ms to import')
+        if heavy_modules:
+            failures.append(f'{module} imports {", ".join(heavy_modules)} at startup')
+    if failures:
+        sys.exit('\n'.join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,387 @@
+"""
+Checks the related persons engines against RelatedPersonsSolution1 as the reference oracle
+and against time and memory budgets
+
+Correctness: every registered engine is run on small generated datasets (with duplicate names and edge case
+last names) and its relationships are compared as sets with the relationships found by
+RelatedPersonsSolution1.RelatedPersons.get_related_names_data. The engines claiming the same output as the
+related persons txt file are also compared item by item, in order, with GetRelatedPersons.get_related_names_data.
+Engines needing an optional library are skipped when it is not installed
+Resume: CheckpointedRelatedPersonsRun is interrupted in its read phase and in its match phase on the same datasets,
+the resumed runs must write byte identical output files to an uninterrupted run
+Performance: every registered engine is run on a larger generated dataset, engines slower than linear on at most
+their max_persons persons. Its best time and its peak memory traced by tracemalloc are checked against its budget
+
+Run from the repository root:
+    python -m benchmarks.differential_harness [--seeds 5] [--persons 300] [--large-persons 20000]
+Exits with an error when an engine finds different relationships, is over its budget or has no budget.
+New engines are added with the register_engine decorator and a BUDGETS entry
+"""
+
+import argparse
+import csv
+import filecmp
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from importlib.util import find_spec
+from benchmarks.generate_persons_data import HEADER, generate_person_rows, get_letters
+
+Engine = namedtuple('Engine', ['name', 'function', 'max_persons', 'ordered', 'requires'])
+# Name of engine: Engine. Each engine takes items (list of [first_name, last_name])
+# and returns an iterable of (name, list of related names) pairs
+ENGINES = {}
+# Name of engine: (persons, seconds, MiB), budget of the engine on that many persons,
+# scaled linearly with the number of persons it is run on and with --budget-scale
+BUDGETS = {'get_related_persons': (2000, 6.0, 16), 'get_related_persons_sketch': (2000, 6.0, 16),
+           'related_persons_query': (20000, 2.0, 64), 'related_persons_store': (20000, 4.0, 64),
+           'related_persons_pipeline': (20000, 2.0, 64), 'checkpointed_related_persons_run': (20000, 3.0, 64),
+           'in_memory_records': (2000, 6.0, 16), 'in_memory_data_frame': (2000, 6.0, 16),
+           'in_memory_arrow_table': (2000, 6.0, 16)}
+# Last names around the hyphen splitting rules, valid as per FilterFields
+EDGE_CASE_LAST_NAMES = ['William', 'Scott-William', 'William-Scott', 'William-William', 'Scott', 'Ann-Scott-Lee',
+                        'Lee', '-Lee', 'Lee-', 'Scott-', 'Van Dyke', 'Van Dyke-Lee', 'william', 'Scott--Lee']
+
+
+def register_engine(name: str, max_persons: int = None, ordered: bool = False, requires: str = None):
+    """
+    Decorator registering an engine checked by the harness
+
+    :param name: string  name of the engine in the report and in BUDGETS
+    :param max_persons: int  engines slower than linear are run on at most this many persons by the performance check
+    :param ordered: boolean  True if the engine returns the same items in the same order as GetRelatedPersons
+    :param requires: string  module of an optional library the engine needs, ex: "pandas"
+    """
+    def register(function):
+        ENGINES[name] = Engine(name=name, function=function, max_persons=max_persons, ordered=ordered,
+                               requires=requires)
+        return function
+    return register
+
+
+def get_records(items: list) -> list:
+    """
+    :param items: list of [first_name, last_name]
+    :return: list of person records in the csv field order, passing FilterFields validation
+    """
+    return [[first_name, last_name, 'Acme Inc', f'{i} Arch St', 'Windsor', 'ON', 'N8N 3N2', '519-569-8399',
+             '519-978-6179', f'person{i}@example.com', 'http://www.example.com']
+            for i, (first_name, last_name) in enumerate(items)]
+
+
+def write_items_csv(items: list, file_path: str) -> str:
+    """
+    :param items: list of [first_name, last_name]
+    :param file_path: string  path of the csv file written
+    :return: string  path of the csv file
+    """
+    with open(file_path, 'w', newline='') as csv_file:
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(HEADER)
+        csv_writer.writerows(get_records(items))
+    return file_path
+
+
+def read_related_names_items(file_path: str) -> list:
+    """
+    :param file_path: string  path of a related persons txt file, ex: "Tom William: Xavier William-Scott \n"
+    :return: list of (name, list of related names) pairs
+    """
+    with open(file_path) as output_file:
+        return [(name, related_names.split(', '))
+                for name, related_names in (line.rstrip('\n')[:-1].split(': ', 1) for line in output_file)]
+
+
+def get_oracle_relationships(items: list) -> set:
+    from RelatedPersonsSolution1 import RelatedPersons
+    return {(name, related_name) for row in RelatedPersons().get_related_names_data(data=items)
+            for name, related_names in row.items() for related_name in related_names}
+
+
+def get_ordered_reference(items: list) -> list:
+    from get_related_persons import GetRelatedPersons
+    return list(GetRelatedPersons(prune_singletons=False).get_related_names_data(items=items).items())
+
+
+@register_engine('get_related_persons', max_persons=2000)
+def run_get_related_persons(items: list):
+    from get_related_persons import GetRelatedPersons
+    return GetRelatedPersons().get_related_names_data(items=items).items()
+
+
+@register_engine('get_related_persons_sketch', max_persons=2000)
+def run_get_related_persons_sketch(items: list):
+    from get_related_persons import GetRelatedPersons
+    # Small enough for over counted tokens, their persons must still be matched correctly
+    return GetRelatedPersons(token_count_memory_bytes=4096).get_related_names_data(items=items).items()
+
+
+@register_engine('related_persons_query', ordered=True)
+def run_related_persons_query(items: list):
+    from related_persons_query import RelatedPersonsQuery
+    return list(RelatedPersonsQuery(items=items).iter_related_names_items())
+
+
+@register_engine('related_persons_store', ordered=True)
+def run_related_persons_store(items: list):
+    from related_persons_store import RelatedPersonsStore
+    with RelatedPersonsStore(db_path=':memory:') as store:
+        store.load_persons(items=items)
+        return list(store.iter_related_names_items())
+
+
+@register_engine('related_persons_pipeline', ordered=True)
+def run_related_persons_pipeline(items: list):
+    from related_persons_pipeline import RelatedPersonsPipeline
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_file_path = os.path.join(work_dir, 'related_persons_info.txt')
+        RelatedPersonsPipeline(input_file_path=write_items_csv(items, os.path.join(work_dir, 'persons.csv')),
+                               count=None).run(output_file_path=output_file_path)
+        return read_related_names_items(output_file_path)
+
+
+@register_engine('checkpointed_related_persons_run', ordered=True)
+def run_checkpointed_related_persons_run(items: list):
+    from checkpointed_related_persons_run import CheckpointedRelatedPersonsRun
+    with tempfile.TemporaryDirectory() as work_dir:
+        output_file_path = os.path.join(work_dir, 'related_persons_info.txt')
+        CheckpointedRelatedPersonsRun(input_file_path=write_items_csv(items, os.path.join(work_dir, 'persons.csv')),
+                                      checkpoint_dir=os.path.join(work_dir, 'checkpoint'), count=None,
+                                      checkpoint_every=max(len(items) // 3, 1)).run(output_file_path=output_file_path)
+        return read_related_names_items(output_file_path)
+
+
+@register_engine('in_memory_records', max_persons=2000, ordered=True)
+def run_in_memory_records(items: list):
+    from in_memory_related_persons import InMemoryRelatedPersons
+    records = [dict(zip(HEADER, record)) for record in get_records(items)]
+    return InMemoryRelatedPersons().get_related_names_data(data=records).items()
+
+
+@register_engine('in_memory_data_frame', max_persons=2000, ordered=True, requires='pandas')
+def run_in_memory_data_frame(items: list):
+    import pandas
+    from in_memory_related_persons import InMemoryRelatedPersons
+    data_frame = pandas.DataFrame(get_records(items), columns=HEADER)
+    return InMemoryRelatedPersons().get_related_names_data(data=data_frame).items()
+
+
+@register_engine('in_memory_arrow_table', max_persons=2000, ordered=True, requires='pyarrow')
+def run_in_memory_arrow_table(items: list):
+    import pyarrow
+    from in_memory_related_persons import InMemoryRelatedPersons
+    table = pyarrow.Table.from_pylist([dict(zip(HEADER, record)) for record in get_records(items)])
+    return InMemoryRelatedPersons().get_related_names_data(data=table).items()
+
+
+def get_relationships(related_names_items) -> set:
+    """
+    :param related_names_items: iterable of (name, list of related names) pairs
+    :return: set of tuples (name, related name)
+    """
+    return {(name, related_name) for name, related_names in related_names_items for related_name in related_names}
+
+
+def generate_items(count: int, seed: int, surnames: int = None) -> list:
+    """
+    Generates filtered items, some of the persons are repeated with the same name
+
+    :return: list of items. Each item is a list consisting of first_name, last_name
+    """
+    random_generator = random.Random(seed)
+    items = [row[:2] for row in generate_person_rows(count=count, seed=seed, surnames=surnames)]
+    for _ in range(count // 20):
+        items.insert(random_generator.randrange(len(items) + 1), list(random_generator.choice(items)))
+    return items
+
+
+def get_correctness_datasets(seeds: int, count: int) -> list:
+    """
+    :return: list of tuples (description, items)
+    """
+    datasets = [('edge case last names', [[f'Person {get_letters(i)}', last_name]
+                                          for i, last_name in enumerate(EDGE_CASE_LAST_NAMES * 2)])]
+    for seed in range(seeds):
+        datasets.append((f'{count} persons, seed {seed}',
+                         generate_items(count=count, seed=seed, surnames=max(count // 5, 1))))
+    return datasets
+
+
+def check_correctness(engines: list, seeds: int, count: int) -> list:
+    """
+    :return: list of failure messages
+    """
+    failures = []
+    for description, items in get_correctness_datasets(seeds=seeds, count=count):
+        expected = get_oracle_relationships(items)
+        expected_items = get_ordered_reference(items)
+        for engine in engines:
+            found_items = [(name, list(related_names)) for name, related_names in engine.function(items)]
+            found = get_relationships(found_items)
+            if found != expected:
+                failures.append(f'{engine.name} on {description}: {len(expected - found)} relationships missing, '
+                                f'{len(found - expected)} unexpected, ex: {sorted(expected ^ found)[:3]}')
+            elif engine.ordered and found_items != expected_items:
+                position = next((i for i, (found_item, expected_item) in enumerate(zip(found_items, expected_items))
+                                 if found_item != expected_item), min(len(found_items), len(expected_items)))
+                failures.append(f'{engine.name} on {description}: {len(found_items)} items, '
+                                f'{len(expected_items)} expected, first difference at item {position}')
+        print(f'{description}: {len(expected)} relationships checked')
+    return failures
+
+
+class SimulatedCrash(Exception):
+    """
+    Raised by the interrupted checkpointed runs of check_resume in place of a crash
+    """
+
+
+def run_interrupted(input_file_path: str, checkpoint_dir: str, output_file_path: str, checkpoint_every: int,
+                    crash_phase: str, crash_at: int = 3) -> bool:
+    """
+    Runs CheckpointedRelatedPersonsRun until it is about to write its crash_at-th checkpoint of the crash phase.
+    The items or output file then already has data past the last checkpoint, which resuming must drop
+
+    :param crash_phase: string  "read" or "match"
+    :return: boolean  True if the run crashed
+    """
+    from checkpointed_related_persons_run import CheckpointedRelatedPersonsRun
+
+    class InterruptedRun(CheckpointedRelatedPersonsRun):
+        checkpoints = 0
+
+        def write_checkpoint(self, state: dict):
+            if state['phase'] == crash_phase:
+                self.checkpoints += 1
+                if self.checkpoints == crash_at:
+                    raise SimulatedCrash(f'{crash_phase} phase after {state["records_read"]} records')
+            super().write_checkpoint(state=state)
+
+    try:
+        InterruptedRun(input_file_path=input_file_path, checkpoint_dir=checkpoint_dir, count=None,
+                       checkpoint_every=checkpoint_every).run(output_file_path=output_file_path)
+    except SimulatedCrash:
+        return True
+    return False
+
+
+def check_resume(seeds: int, count: int) -> list:
+    """
+    Interrupts CheckpointedRelatedPersonsRun in its read phase and in its match phase, resumes it
+    and checks its output file is byte identical to the output of an uninterrupted run
+
+    :return: list of failure messages
+    """
+    from checkpointed_related_persons_run import CheckpointedRelatedPersonsRun
+    failures = []
+    for description, items in get_correctness_datasets(seeds=seeds, count=count):
+        checkpoint_every = max(len(items) // 10, 1)
+        with tempfile.TemporaryDirectory() as work_dir:
+            input_file_path = write_items_csv(items, os.path.join(work_dir, 'persons.csv'))
+            expected_file_path = os.path.join(work_dir, 'expected.txt')
+            CheckpointedRelatedPersonsRun(input_file_path=input_file_path, count=None,
+                                          checkpoint_dir=os.path.join(work_dir, 'uninterrupted')).run(
+                output_file_path=expected_file_path)
+            for crash_phase in ('read', 'match'):
+                checkpoint_dir = os.path.join(work_dir, crash_phase)
+                output_file_path = os.path.join(work_dir, f'{crash_phase}.txt')
+                if not run_interrupted(input_file_path=input_file_path, checkpoint_dir=checkpoint_dir,
+                                       output_file_path=output_file_path, checkpoint_every=checkpoint_every,
+                                       crash_phase=crash_phase):
+                    failures.append(f'resume on {description}: the run ended before a crash in its {crash_phase} '
+                                    f'phase')
+                    continue
+                resumed_run = CheckpointedRelatedPersonsRun(input_file_path=input_file_path,
+                                                            checkpoint_dir=checkpoint_dir, count=None,
+                                                            checkpoint_every=checkpoint_every)
+                state = resumed_run.load_checkpoint(identity=resumed_run.get_run_identity(output_file_path))
+                if state is None or state['phase'] != crash_phase:
+                    failures.append(f'resume on {description}: no checkpoint of the {crash_phase} phase to resume')
+                    continue
+                resumed_run.run(output_file_path=output_file_path, resume=True)
+                if not filecmp.cmp(expected_file_path, output_file_path, shallow=False):
+                    failures.append(f'resume on {description}: output after a crash in the {crash_phase} phase '
+                                    f'differs from an uninterrupted run')
+        print(f'{description}: resume checked after a crash in the read and in the match phase')
+    return failures
+
+
+def measure(engine: Engine, items: list, repeat: int) -> tuple:
+    """
+    :return: tuple (best time in seconds, peak traced memory in MiB)
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in engine.function(items):
+            pass
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    for _ in engine.function(items):
+        pass
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(timings), peak_memory / (1024 * 1024)
+
+
+def check_budgets(engines: list, count: int, budget_scale: float, repeat: int) -> list:
+    """
+    :return: list of failure messages
+    """
+    failures = []
+    datasets = {}
+    for engine in engines:
+        persons = count if engine.max_persons is None else min(count, engine.max_persons)
+        if persons not in datasets:
+            datasets[persons] = generate_items(count=persons, seed=0, surnames=max(persons // 4, 1))
+        items = datasets[persons]
+        seconds, mib = measure(engine=engine, items=items, repeat=repeat)
+        if engine.name not in BUDGETS:
+            failures.append(f'{engine.name} has no budget, add it to BUDGETS')
+            print(f'{engine.name}: {seconds:.3f}s, {mib:.1f} MiB on {len(items)} persons (no budget)')
+            continue
+        budget_persons, *budget = BUDGETS[engine.name]
+        max_seconds, max_mib = (limit * budget_scale * persons / budget_persons for limit in budget)
+        print(f'{engine.name}: {seconds:.3f}s of {max_seconds:.3f}s, {mib:.1f} of {max_mib:.1f} MiB '
+              f'on {len(items)} persons')
+        if seconds > max_seconds:
+            failures.append(f'{engine.name} took {seconds:.3f}s on {len(items)} persons, budget {max_seconds:.3f}s')
+        if mib > max_mib:
+            failures.append(f'{engine.name} used {mib:.1f} MiB on {len(items)} persons, budget {max_mib:.1f} MiB')
+    return failures
+
+
+def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Checks related persons engines against RelatedPersonsSolution1')
+    parser.add_argument('--engines', nargs='+', choices=sorted(ENGINES), default=sorted(ENGINES))
+    parser.add_argument('--seeds', type=int, default=5, help='number of generated datasets checked by the oracle')
+    parser.add_argument('--persons', type=int, default=300, help='persons in each dataset checked by the oracle')
+    parser.add_argument('--large-persons', type=int, default=20000, help='persons in the performance dataset')
+    parser.add_argument('--budget-scale', type=float, default=1.0, help='multiplies every time and memory budget')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per engine, the best time is kept')
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    engines = []
+    for name in args.engines:
+        if ENGINES[name].requires is not None and find_spec(ENGINES[name].requires) is None:
+            print(f'{name}: skipped, {ENGINES[name].requires} is not installed')
+        else:
+            engines.append(ENGINES[name])
+    failures = check_correctness(engines=engines, seeds=args.seeds, count=args.persons)
+    if ENGINES['checkpointed_related_persons_run'] in engines:
+        failures += check_resume(seeds=args.seeds, count=args.persons)
+    failures += check_budgets(engines=engines, count=args.large_persons, budget_scale=args.budget_scale,
+                              repeat=args.repeat)
+    if failures:
+        sys.exit('\n'.join(failures))
+    print('All engines match the oracle within their budgets')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Generates persons csv files in the same layout as './persons_raw_data.csv' for benchmarks
+
+Run from the repository root:
+    python -m benchmarks.generate_persons_data <output csv file> <number of persons>
+"""
+
+import csv
+import random
+import sys
+
+HEADER = ['first_name', 'last_name', 'company_name', 'address', 'city', 'province', 'postal', 'phone1', 'phone2',
+          'email', 'web']
+FIRST_NAMES = ['Tom', 'Xavier', 'Antonio', 'Jake', 'Emily', 'Lilly', 'Maria', 'Noah', 'Olivia', 'Liam', 'Ava',
+               'Ethan', 'Mia', 'Lucas', 'Zoe', 'Amelia']
+COMPANIES = ['Riebesell, H F Jr', 'Deloitte & Touche', 'Oklahoma Neon Inc', 'Acme "Best" Corp', 'Bayside Foods']
+
+
+def get_letters(number: int) -> str:
+    """
+    Converts a number to letters, names can not contain digits
+
+    :param number: int, ex: 27
+    :return: string, ex: "bb"
+    """
+    letters = chr(ord('a') + number % 26)
+    while number >= 26:
+        number = number // 26 - 1
+        letters = chr(ord('a') + number % 26) + letters
+    return letters
+
+
+def get_last_name(random_generator: random.Random, surnames: int) -> str:
+    """
+    Gets a last name. Most of the last names are unique, some are hyphenated
+
+    :param random_generator: random.Random
+    :param surnames: int  number of distinct surname tokens
+    :return: string, ex: "Surnamem" or "Surnamem-Surnameh"
+    """
+    last_name = f'Surname{get_letters(random_generator.randrange(surnames))}'
+    if random_generator.random() < 0.2:
+        last_name += f'-Surname{get_letters(random_generator.randrange(surnames))}'
+    return last_name
+
+
+def generate_person_rows(count: int, seed: int = 0, surnames: int = None):
+    """
+    Generator function which returns person records with unique full names
+
+    :param count: int  number of person records
+    :param seed: int  seed for the random generator
+    :param surnames: int  number of distinct surname tokens, default is the number of persons
+    :return: list  person details in the csv field order
+    """
+    random_generator = random.Random(seed)
+    surnames = surnames or max(count, 1)
+    for i in range(count):
+        yield [f'{random_generator.choice(FIRST_NAMES)} {get_letters(i)}', get_last_name(random_generator, surnames),
+               random_generator.choice(COMPANIES), f'{i} Arch St #{i % 97}', 'Windsor', 'ON', 'N8N 3N2',
+               '519-569-8399', '519-978-6179', f'person{i}@example.com', 'http://www.example.com']
+
+
+def write_persons_csv(file_path: str, count: int, seed: int = 0, surnames: int = None) -> str:
+    """
+    Writes a persons csv file with a header line
+
+    :param file_path: string  path of the output csv file
+    :param count: int  number of person records
+    :param seed: int  seed for the random generator
+    :param surnames: int  number of distinct surname tokens
+    :return: string  path of the output csv file
+    """
+    with open(file_path, 'w', newline='') as output_file:
+        csv_writer = csv.writer(output_file)
+        csv_writer.writerow(HEADER)
+        csv_writer.writerows(generate_person_rows(count=count, seed=seed, surnames=surnames))
+    return file_path
+
+
+if __name__ == "__main__":
+    write_persons_csv(file_path=sys.argv[1], count=int(sys.argv[2]))
@@ -0,0 +1,192 @@
+import json
+import os
+from utils.customLogger import LazyLogger
+import logging
+from utils.progressReporter import ProgressReporter
+from get_first_n_records_from_csv import GetFirstNRecordsFromCSVFile
+from filter_fields import FilterFields
+from related_persons_query import RelatedPersonsQuery
+from format_and_write_relatednames_to_file import FormatAndWriteRelatedNamesToAFile
+
+
+# Finds related persons in a large csv file with periodic checkpoints, an interrupted run resumes from the last one
+class CheckpointedRelatedPersonsRun:
+    """
+    CheckpointedRelatedPersonsRun class reads the memory mapped input file, filters and indexes the persons,
+    then matches them and writes the output file, saving its state to a checkpoint directory as it goes:
+        checkpoint.json  input file offset, filter statistics and sizes of items and output files, written atomically
+        items.jsonl      [first_name, last_name] of the persons passed filtering so far, appended
+    A resumed run truncates items.jsonl and the output file to their sizes at the last checkpoint,
+    rebuilds the index from items.jsonl and continues reading or writing where the checkpoint was taken.
+    Progress is logged with rows per second and ETA. The output is the same as an uninterrupted run
+
+    Usage:
+        CheckpointedRelatedPersonsRun(input_file_path='./export.csv', checkpoint_dir='./checkpoint',
+                                      count=None).run(output_file_path='related_persons_info.txt', resume=True)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    CHECKPOINT_FILE = 'checkpoint.json'
+    ITEMS_FILE = 'items.jsonl'
+    CHECKPOINT_VERSION = 1
+
+    def __init__(self, input_file_path: str = "./persons_raw_data.csv", checkpoint_dir: str = './checkpoint',
+                 count: int = 1000, checkpoint_every: int = 100000, progress_interval: float = 10.0,
+                 name_normaliser=None):
+        """
+        :param input_file_path: string  path of the input csv file
+        :param checkpoint_dir: string  directory of the checkpoint files, created when missing
+        :param count: int  number of person records to consider, all the records when None
+        :param checkpoint_every: int  records read, or persons written, between two checkpoints
+        :param progress_interval: float  minimum seconds between two progress log lines
+        :param name_normaliser: NameNormaliser  accepts and matches international names when given
+        """
+        self.input_file_path = input_file_path
+        self.checkpoint_dir = checkpoint_dir
+        self.count = count
+        self.checkpoint_every = checkpoint_every
+        self.progress_interval = progress_interval
+        self.name_normaliser = name_normaliser
+        self.checkpoint_path = os.path.join(checkpoint_dir, self.CHECKPOINT_FILE)
+        self.items_path = os.path.join(checkpoint_dir, self.ITEMS_FILE)
+
+    def get_run_identity(self, output_file_path: str) -> dict:
+        """
+        :param output_file_path: string  path of the output txt file
+        :return: dict of the input file and settings a checkpoint is valid for
+        """
+        input_stat = os.stat(self.input_file_path)
+        return {'version': self.CHECKPOINT_VERSION, 'input_file_path': os.path.abspath(self.input_file_path),
+                'input_size': input_stat.st_size, 'input_mtime_ns': input_stat.st_mtime_ns,
+                'output_file_path': os.path.abspath(output_file_path), 'count': self.count,
+                'name_normalisation': self.name_normaliser.configuration if self.name_normaliser is not None else None}
+
+    def load_checkpoint(self, identity: dict) -> dict:
+        """
+        :param identity: dict (received from get_run_identity)
+        :return: dict  state of the last checkpoint. None when there is no checkpoint for this input and settings
+        """
+        try:
+            with open(self.checkpoint_path) as checkpoint_file:
+                state = json.load(checkpoint_file)
+        except (IOError, ValueError):
+            return None
+        if state.get('identity') != identity:
+            self.log.warning(msg=f'Checkpoint in {self.checkpoint_dir} is for another input or settings, starting over')
+            return None
+        return state
+
+    def write_checkpoint(self, state: dict):
+        """
+        Writes the state to a temporary file and renames it over the checkpoint, a crash leaves the last one intact
+
+        :param state: dict  run state
+        """
+        temp_path = f'{self.checkpoint_path}.tmp'
+        with open(temp_path, 'w') as checkpoint_file:
+            json.dump(state, checkpoint_file)
+            checkpoint_file.flush()
+            os.fsync(checkpoint_file.fileno())
+        os.replace(temp_path, self.checkpoint_path)
+
+    @staticmethod
+    def sync_file(output_file):
+        output_file.flush()
+        os.fsync(output_file.fileno())
+
+    def run(self, output_file_path: str = 'related_persons_info.txt', resume: bool = False) -> bool:
+        """
+        :param output_file_path: string  path of the output txt file
+        :param resume: boolean  True continues from the last checkpoint of the same input and settings, if any
+        :return: boolean
+        True if the output was written
+        """
+        try:
+            identity = self.get_run_identity(output_file_path=output_file_path)
+        except OSError:
+            self.log.error(msg='Unable to access input data file')
+            return False
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        state = self.load_checkpoint(identity=identity) if resume else None
+        if state is None:
+            state = {'identity': identity, 'phase': 'read', 'offset': 0, 'records_read': 0,
+                     'rejected_counts': dict.fromkeys(FilterFields.rules, 0), 'items_file_size': 0,
+                     'persons_written': 0, 'output_file_size': 0}
+        else:
+            self.log.info(msg=f'Resuming {state["phase"]} from checkpoint after {state["records_read"]} records')
+        if state['phase'] == 'done':
+            self.log.info(msg="Check out the output file for Related Persons details")
+            return True
+
+        query = RelatedPersonsQuery(items=[], name_normaliser=self.name_normaliser)
+        query.build_index()
+        with open(self.items_path, 'a+b') as items_file:
+            items_file.truncate(state['items_file_size'])
+            items_file.seek(0)
+            for line in items_file:
+                first_name, last_name = json.loads(line)
+                query.add_person(first_name=first_name, last_name=last_name)
+            if state['phase'] == 'read':
+                self._read_and_filter(state=state, query=query, items_file=items_file)
+        self._match_and_write(state=state, query=query, output_file_path=output_file_path)
+        self.log.info(msg="Check out the output file for Related Persons details")
+        return True
+
+    def _read_and_filter(self, state: dict, query: RelatedPersonsQuery, items_file):
+        filter_fields = FilterFields(name_normaliser=self.name_normaliser)
+        progress = ProgressReporter(name='read', total=state['identity']['input_size'],
+                                    interval_seconds=self.progress_interval)
+        progress.start(position=state['offset'], rows=state['records_read'])
+        records = GetFirstNRecordsFromCSVFile().read_raw_data_from_mmap(file_path=self.input_file_path,
+                                                                         start_offset=state['offset'])
+        for fields, next_offset in records:
+            if self.count is not None and state['records_read'] >= self.count:
+                break
+            row = [field.decode('utf-8') for field in fields]
+            rule = filter_fields.get_first_failing_rule(row)
+            if rule is None:
+                items_file.write(f'{json.dumps(row[0:2])}\n'.encode())
+                query.add_person(first_name=row[0], last_name=row[1])
+            else:
+                state['rejected_counts'][rule] += 1
+            state['offset'] = next_offset
+            state['records_read'] += 1
+            if state['records_read'] % self.checkpoint_every == 0:
+                self.sync_file(items_file)
+                state['items_file_size'] = items_file.tell()
+                self.write_checkpoint(state=state)
+            progress.update(position=state['offset'], rows=state['records_read'])
+        self.sync_file(items_file)
+        state['items_file_size'] = items_file.tell()
+        state['phase'] = 'match'
+        self.write_checkpoint(state=state)
+        for rule, rejected_count in state['rejected_counts'].items():
+            if rejected_count:
+                self.log.info(msg=f'{rejected_count} records rejected by {rule} rule')
+        progress.finish(rows=state['records_read'])
+
+    def _match_and_write(self, state: dict, query: RelatedPersonsQuery, output_file_path: str):
+        persons_total = sum(1 for _ in query.iter_related_names())
+        progress = ProgressReporter(name='match', total=persons_total, interval_seconds=self.progress_interval)
+        progress.start(position=state['persons_written'], rows=state['persons_written'])
+        with open(output_file_path, 'ab') as output_file:
+            output_file.truncate(state['output_file_size'])
+            names = query.iter_related_names()
+            for _ in zip(range(state['persons_written']), names):
+                pass
+            for name in names:
+                related_names_data = {name: query.get_related_names(name=name)}
+                for match in FormatAndWriteRelatedNamesToAFile.build_format_for_related_names(related_names_data):
+                    output_file.write(match.encode())
+                state['persons_written'] += 1
+                if state['persons_written'] % self.checkpoint_every == 0:
+                    self.sync_file(output_file)
+                    state['output_file_size'] = output_file.tell()
+                    self.write_checkpoint(state=state)
+                progress.update(position=state['persons_written'], rows=state['persons_written'])
+            self.sync_file(output_file)
+            state['output_file_size'] = output_file.tell()
+        state['phase'] = 'done'
+        self.write_checkpoint(state=state)
+        progress.finish(rows=state['persons_written'])
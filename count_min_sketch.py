@@ -0,0 +1,53 @@
+from array import array
+
+
+# Approximate counts of strings in a fixed amount of memory
+class CountMinSketch:
+    """
+    CountMinSketch class counts strings in a table of 'depth' rows of 32 bit counters.
+    Each string is counted in one counter of every row, its count is the smallest of these counters.
+    A count is never less than the true count, it is more when other strings share all the counters
+
+    Usage:
+        token_counts = CountMinSketch(memory_bytes=1 << 20)
+        token_counts.add('William')
+        token_counts['William']
+    """
+
+    def __init__(self, memory_bytes: int = 1 << 20, depth: int = 4):
+        """
+        :param memory_bytes: int  size of the counters table
+        :param depth: int  number of rows, more rows lower the chance of an over count
+        """
+        self.depth = depth
+        self.width = max(memory_bytes // (4 * depth), 1)
+        self.counters = array('I', bytes(4 * self.width * depth))
+
+    def get_positions(self, key: str):
+        """
+        Generator function which returns the position of the counter of the key in every row.
+        Positions are derived from two hashes of the key (double hashing)
+
+        :param key: string
+        :return: int
+        """
+        first_hash = hash(key)
+        second_hash = hash((key, self.depth)) | 1
+        for row in range(self.depth):
+            yield row * self.width + (first_hash + row * second_hash) % self.width
+
+    def add(self, key: str):
+        """
+        :param key: string
+        """
+        counters = self.counters
+        for position in self.get_positions(key):
+            counters[position] += 1
+
+    def __getitem__(self, key: str) -> int:
+        """
+        :param key: string
+        :return: int  count of the key, never less than the number of times it was added
+        """
+        counters = self.counters
+        return min(counters[position] for position in self.get_positions(key))
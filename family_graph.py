@@ -0,0 +1,148 @@
+from array import array
+from collections import deque
+from utils.customLogger import LazyLogger
+import logging
+
+
+def build_csr(lists: list) -> tuple:
+    """
+    Packs lists of ints into compressed sparse row arrays, list i is values[offsets[i]:offsets[i + 1]]
+
+    :param lists: list of lists of ints
+    :return: tuple (offsets, values) of array.array
+    """
+    offsets = array('q', [0])
+    values = array('q')
+    for row in lists:
+        values.extend(row)
+        offsets.append(len(values))
+    return offsets, values
+
+
+# Answers transitive relatives queries on a graph of last name tokens bridged by persons
+class FamilyGraph:
+    """
+    FamilyGraph class keeps last name tokens as nodes. Two tokens are adjacent when one person has both,
+    ex: Xavier William-Scott bridges the William and Scott families. All the arrays are CSR (offsets, values):
+        token -> persons having the token
+        person -> tokens of the person
+        token -> adjacent tokens
+    A person is at depth 1 from the persons sharing a token with it, at depth 2 from the persons sharing a token
+    with those and so on. Queries walk the token graph breadth first, person pairs are never enumerated,
+    so the cost is linear in the number of tokens, adjacencies and memberships visited
+
+    Usage:
+        graph = FamilyGraph(query=RelatedPersonsQuery())
+        graph.get_relatives('Tom William', max_depth=2)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, query):
+        """
+        :param query: RelatedPersonsQuery  index of the persons. Hub family tokens of the query are left out
+        """
+        query.build_index()
+        self.query = query
+        self.names = query.names
+        self.tokens = [token for token in query.token_index if not query.is_hub_token(token)]
+        token_ids = {token: token_id for token_id, token in enumerate(self.tokens)}
+        self.person_offsets, self.person_token_ids = build_csr(
+            [[token_ids[token] for token in query.get_matching_tokens(person_id)]
+             for person_id in range(len(self.names))])
+        self.token_offsets, self.token_person_ids = build_csr(
+            [query.token_index[token] for token in self.tokens])
+        adjacent_tokens = [set() for _ in self.tokens]
+        for person_id in range(len(self.names)):
+            person_token_ids = self.get_token_ids_of_person(person_id)
+            if len(person_token_ids) > 1:
+                for token_id in person_token_ids:
+                    adjacent_tokens[token_id].update(person_token_ids)
+        self.adjacency_offsets, self.adjacent_token_ids = build_csr(
+            [sorted(token_ids_ - {token_id}) for token_id, token_ids_ in enumerate(adjacent_tokens)])
+        self.log.info(msg=f'Family graph of {len(self.tokens)} last name tokens '
+                          f'and {len(self.adjacent_token_ids) // 2} token links')
+
+    def get_token_ids_of_person(self, person_id: int) -> array:
+        return self.person_token_ids[self.person_offsets[person_id]:self.person_offsets[person_id + 1]]
+
+    def get_person_ids_of_token(self, token_id: int) -> array:
+        return self.token_person_ids[self.token_offsets[token_id]:self.token_offsets[token_id + 1]]
+
+    def get_adjacent_token_ids(self, token_id: int) -> array:
+        return self.adjacent_token_ids[self.adjacency_offsets[token_id]:self.adjacency_offsets[token_id + 1]]
+
+    def iter_token_depths(self, token_ids, max_depth: int = None, visited: bytearray = None):
+        """
+        Generator function which walks the token graph breadth first from the given tokens
+
+        :param token_ids: iterable of int  tokens at depth 1
+        :param max_depth: int  tokens up to this depth are returned, at least 1. All the reachable tokens when not given
+        :param visited: bytearray  flag per token, set for the tokens walked. Tokens already set are not walked again
+        :return: tuple (token id, depth)
+        """
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f'max_depth must be at least 1, got {max_depth}')
+        if visited is None:
+            visited = bytearray(len(self.tokens))
+        queue = deque()
+        for token_id in token_ids:
+            if not visited[token_id]:
+                visited[token_id] = 1
+                queue.append((token_id, 1))
+        while queue:
+            token_id, depth = queue.popleft()
+            yield token_id, depth
+            if max_depth is not None and depth >= max_depth:
+                continue
+            for adjacent_token_id in self.get_adjacent_token_ids(token_id):
+                if not visited[adjacent_token_id]:
+                    visited[adjacent_token_id] = 1
+                    queue.append((adjacent_token_id, depth + 1))
+
+    def get_relatives(self, name: str, max_depth: int = 2) -> list:
+        """
+        Gets the persons within max_depth hops of a person, nearest first then in input order.
+        When more than one person has the name, the relatives of all of them are returned
+
+        :param name: string  first_name, last_name of a person, ex: "Tom William"
+        :param max_depth: int  1 gives the persons sharing a last name token, same as get_related_names
+        :return: list of tuples (name, depth). Empty list when the name is unknown
+        """
+        person_ids = self.query.name_index.get(name, [])
+        start_token_ids = [token_id for person_id in person_ids for token_id in self.get_token_ids_of_person(person_id)]
+        person_depths = {}
+        for token_id, depth in self.iter_token_depths(start_token_ids, max_depth=max_depth):
+            for other_id in self.get_person_ids_of_token(token_id):
+                person_depths.setdefault(other_id, depth)
+        for person_id in person_ids:
+            person_depths.pop(person_id, None)
+        return [(self.names[other_id], depth)
+                for other_id, depth in sorted(person_depths.items(), key=lambda item: (item[1], item[0]))]
+
+    def iter_families(self):
+        """
+        Generator function which returns the connected families i.e. the persons linked by any number of hops,
+        in the order of their first person. Persons without relatives are not returned
+
+        :return: list of person ids of a family, in input order
+        """
+        visited = bytearray(len(self.tokens))
+        for person_id in range(len(self.names)):
+            token_ids = self.get_token_ids_of_person(person_id)
+            if not token_ids or visited[token_ids[0]]:
+                continue
+            family = set()
+            for token_id, _ in self.iter_token_depths(token_ids, visited=visited):
+                family.update(self.get_person_ids_of_token(token_id))
+            if len(family) > 1:
+                yield sorted(family)
+
+    def build_format_for_families(self) -> str:
+        """
+        Generator function which returns string with one family per line
+
+        :return: string (formatted), ex: "Family 1 (3 members): Tom William, Xavier William-Scott, Emily Scott \n"
+        """
+        for number, family in enumerate(self.iter_families(), start=1):
+            yield f'Family {number} ({len(family)} members): {", ".join(self.names[i] for i in family)} \n'
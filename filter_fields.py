@@ -1,10 +1,12 @@
 import re
-from validate_email import validate_email
-from utils.customLogger import custom_logger as cl
+from itertools import islice
+from utils.customLogger import LazyLogger
 import logging
-from toolz import functoolz
 from get_first_n_records_from_csv import GetFirstNRecordsFromCSVFile
 
+NAME_WITH_ATLEAST_ONE_ALPHA = re.compile('[a-zA-Z]')
+NAME_WITH_ALPHA_OR_SPACE_HYPHEN_ONLY = re.compile('^[a-zA-Z- ]*$')
+
 
 # Applies all Validation Rules on fields and returns filtered data
 class FilterFields:
@@ -13,7 +15,48 @@ class FilterFields:
     and returns list items where each item is a list consisting of a person's first_name and last_name
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
+
+    # Validation rules in the order they are applied, a record is rejected by the first rule it fails
+    rules = ['missing_fields', 'field_longer_than_257', 'blank_first_name_last_name_or_email', 'invalid_email',
+             'name_without_alpha', 'name_with_chars_other_than_alpha_space_hyphen']
+
+    def __init__(self, name_normaliser=None):
+        """
+        :param name_normaliser: NameNormaliser  accepts names in any script like Müller or O'Brien-Núñez when given,
+        otherwise only a-z, A-Z, space and hyphen are accepted
+        """
+        self.name_normaliser = name_normaliser
+
+    @staticmethod
+    def is_valid_email(email: str) -> bool:
+        """
+        Checks whole email address is in valid format using validate_email library
+        and local part of email length is less than 65 chars
+
+        :param email: string
+        :return: boolean
+        """
+        from validate_email import validate_email  # Imported on first use, it loads smtplib and networking modules
+        return bool(validate_email(email)) and len(email.split('@')[0]) < 65
+
+    def is_name_with_atleast_one_alpha(self, name: str) -> bool:
+        """
+        :param name: string  first_name or last_name
+        :return: boolean
+        """
+        if self.name_normaliser is not None:
+            return self.name_normaliser.is_name_with_atleast_one_alpha(name)
+        return NAME_WITH_ATLEAST_ONE_ALPHA.search(name) is not None
+
+    def is_name_with_alpha_or_space_hyphen_only(self, name: str) -> bool:
+        """
+        :param name: string  first_name or last_name
+        :return: boolean
+        """
+        if self.name_normaliser is not None:
+            return self.name_normaliser.is_name_with_allowed_chars_only(name)
+        return NAME_WITH_ALPHA_OR_SPACE_HYPHEN_ONLY.fullmatch(name) is not None
 
     def get_data_with_fields_length_less_than_257(self, data: list) -> list:
         """
@@ -66,8 +109,7 @@ class FilterFields:
         """
         data_with_valid_email_format = []
         for row in data:
-            local_part = row[-1].split('@')[0]
-            if (validate_email(row[-1])) and (len(local_part) < 65):
+            if self.is_valid_email(row[-1]):
                 data_with_valid_email_format.append(row)
         self.log.info(f'{len(data_with_valid_email_format)} out of {len(data)} records have valid emails')
         return data_with_valid_email_format
@@ -120,7 +162,7 @@ class FilterFields:
         for row in data:
             field_with_atleast_one_alpha = True
             for field in row:
-                if not re.search('[a-zA-Z]', field):
+                if not self.is_name_with_atleast_one_alpha(field):
                     field_with_atleast_one_alpha = False
                     break
             if field_with_atleast_one_alpha is True:
@@ -143,7 +185,7 @@ class FilterFields:
         for row in data:
             field_with_alpha_space_hyphen = True
             for field in row:
-                if not re.fullmatch('^[a-zA-Z- ]*$',  field):
+                if not self.is_name_with_alpha_or_space_hyphen_only(field):
                     field_with_alpha_space_hyphen = False
                     break
             if field_with_alpha_space_hyphen is True:
@@ -153,23 +195,103 @@ class FilterFields:
         return data_with_alpha_or_space_hypen
 
     # All filter actions methods calling
-    def get_filtered_first_lastname_details(self) -> list:
+    def get_filtered_first_lastname_details(self, data: list = None, file_path: str = "./persons_raw_data.csv",
+                                            use_mmap: bool = False) -> list:
         """
         This function calls all the user validation functions above in an order and return persons details with
         last_name and first_name
         Uses fancy functoolz.compose from toolz library
 
+        :param data: list of person records (received from 'get_first_n_records'). Read from file when not given
+        :param file_path: string  path of the input csv file
+        :param use_mmap: boolean  True reads the input file memory mapped and decodes the required fields only.
+        Given data is then expected as received from 'get_first_n_projected_records_from_mmap'
         :return:list of items
         Each item is a person details which have gone through all user validations as per requirements
         Each item is a list consisting of first_name, last_name only
         """
-        data = GetFirstNRecordsFromCSVFile().get_first_n_records(count=1000)
-        name_details_after_fields_filtering = functoolz.compose(self.get_names_containing_alpha_or_space_hyphen_only,
-                                                                self.get_names_containing_atleast_one_alpha,
-                                                                self.get_first_and_lastname_details_and_remove_email,
-                                                                self.get_fields_with_valid_email_format,
-                                                                self.get_first_last_name_email_notblank_combination,
-                                                                self.get_data_with_only_first_lastname_email,
-                                                                self.get_data_with_fields_length_less_than_257)(data)
+        from toolz import functoolz
+        filters = [self.get_names_containing_alpha_or_space_hyphen_only,
+                   self.get_names_containing_atleast_one_alpha,
+                   self.get_first_and_lastname_details_and_remove_email,
+                   self.get_fields_with_valid_email_format,
+                   self.get_first_last_name_email_notblank_combination]
+        if use_mmap:
+            # Length of fields is checked and required fields are kept while reading
+            if data is None:
+                data = GetFirstNRecordsFromCSVFile().get_first_n_projected_records_from_mmap(count=1000,
+                                                                                            file_path=file_path)
+        else:
+            if data is None:
+                data = GetFirstNRecordsFromCSVFile().get_first_n_records(count=1000, file_path=file_path)
+            filters.extend([self.get_data_with_only_first_lastname_email,
+                            self.get_data_with_fields_length_less_than_257])
+        name_details_after_fields_filtering = functoolz.compose(*filters)(data)
         self.log.info(msg=f'{len(name_details_after_fields_filtering)} records passed filtering')
         return name_details_after_fields_filtering
+
+    def get_first_failing_rule(self, row: list) -> str:
+        """
+        Applies all the validation rules on a person record at once
+
+        :param row: list  person details as read from csv file
+        :return: string  name of the first rule in 'rules' the record fails. None if the record passes all
+        """
+        if len(row) < 10:
+            return 'missing_fields'
+        return self.get_first_failing_rule_of_person(first_name=row[0], last_name=row[1], email=row[9], fields=row)
+
+    def get_first_failing_rule_of_person(self, first_name: str, last_name: str, email: str,
+                                         fields: list = None) -> str:
+        """
+        Applies the validation rules other than 'missing_fields' on the fields of a person
+
+        :param first_name: string
+        :param last_name: string
+        :param email: string
+        :param fields: list of all the fields of the person checked by 'field_longer_than_257' rule,
+        first_name, last_name and email when not given
+        :return: string  name of the first rule in 'rules' the person fails. None if the person passes all
+        """
+        for field in fields if fields is not None else (first_name, last_name, email):
+            if len(field) > 257:
+                return 'field_longer_than_257'
+        if not (first_name and last_name and email):
+            return 'blank_first_name_last_name_or_email'
+        if not self.is_valid_email(email):
+            return 'invalid_email'
+        if not (self.is_name_with_atleast_one_alpha(first_name) and self.is_name_with_atleast_one_alpha(last_name)):
+            return 'name_without_alpha'
+        if not (self.is_name_with_alpha_or_space_hyphen_only(first_name)
+                and self.is_name_with_alpha_or_space_hyphen_only(last_name)):
+            return 'name_with_chars_other_than_alpha_space_hyphen'
+        return None
+
+    def get_filtered_first_lastname_details_single_pass(self, file_path: str = "./persons_raw_data.csv",
+                                                        reject_handler=None, count: int = 1000) -> list:
+        """
+        Reads the input file once and applies all the validation rules on each record as it is read.
+        Same result as 'get_filtered_first_lastname_details', the rejected records are streamed to the handler
+
+        :param file_path: string  path of the input csv file
+        :param reject_handler: callable with params (line_number, rule, row), ex: RejectedRecordsWriter.
+        Called for each rejected record with its line number in the input file and the first rule it fails
+        :param count: int  number of person records to consider
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        filtered_first_lastname_details = []
+        rejected_counts = dict.fromkeys(self.rules, 0)
+        records = GetFirstNRecordsFromCSVFile().read_data_from_csv(file_path=file_path, with_line_numbers=True)
+        for line_number, row in islice(records, count):
+            rule = self.get_first_failing_rule(row)
+            if rule is None:
+                filtered_first_lastname_details.append(row[0:2])
+                continue
+            rejected_counts[rule] += 1
+            if reject_handler is not None:
+                reject_handler(line_number, rule, row)
+        for rule, rejected_count in rejected_counts.items():
+            if rejected_count:
+                self.log.info(msg=f'{rejected_count} records rejected by {rule} rule')
+        self.log.info(msg=f'{len(filtered_first_lastname_details)} records passed filtering')
+        return filtered_first_lastname_details
@@ -1,6 +1,11 @@
-from utils.customLogger import custom_logger as cl
+import sys
+from itertools import chain
+from utils.customLogger import LazyLogger
 import logging
+from get_first_n_records_from_csv import GetFirstNRecordsFromCSVFile
+from filter_fields import FilterFields
 from get_related_persons import GetRelatedPersons
+from utils.stageProfiler import StageProfiler
 
 
 # Formats and writes related people to related_persons_info_solution2.txt file
@@ -10,7 +15,25 @@ class FormatAndWriteRelatedNamesToAFile:
         formats it as mentioned in requirements document and writes into a txt file"
         """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
+
+    # Settings changing the output, part of the result cache key
+    cache_configuration = {'record_count': 1000, 'split_char': '-', 'output_format': 'text'}
+
+    def get_cache_configuration(self, name_normaliser=None, hub_threshold: int = None,
+                                group_file_path: str = None) -> dict:
+        """
+        :param name_normaliser: NameNormaliser  used for the run, if any
+        :param hub_threshold: int  hub family threshold used for the run, if any
+        :param group_file_path: string  hub family group file named by the summary lines of the output, if any
+        :return: dict of settings changing the output, part of ResultCache key
+        """
+        configuration = dict(self.cache_configuration,
+                             name_normalisation=name_normaliser.configuration if name_normaliser is not None else None)
+        if hub_threshold is not None:
+            configuration['hub_threshold'] = hub_threshold
+            configuration['group_file_path'] = group_file_path
+        return configuration
 
     # Generator
     @staticmethod
@@ -18,34 +41,386 @@ class FormatAndWriteRelatedNamesToAFile:
         """
         Generator function which returns string in the expected output
         :param related_names_data: list (received from get_related_names_data)
+        or iterable of (name, related names) pairs, ex: RelatedPersonsStore.iter_related_names_items()
         :return: string (formatted)
         """
-        for key, value in related_names_data.items():
+        items = related_names_data.items() if isinstance(related_names_data, dict) else related_names_data
+        for key, value in items:
             matched_names = ', '.join([str(x) for x in value])
             yield f'{key}: {matched_names} \n'
 
-    def write_related_names_data_to_text_file(self):
+    @staticmethod
+    def iter_hub_family_summaries(query, group_file_path: str):
+        """
+        Generator function which returns one (name, related names) pair per hub family, written in place of
+        the related names of its members
+
+        :param query: RelatedPersonsQuery  built with a hub_threshold
+        :param group_file_path: string  path of the txt file listing the members of the hub families
+        :return: tuple (token, list), ex: ("Smith", ["48,211 members, see group file groups.txt"])
         """
-        Writes the string received from Generator to 'related_persons_info.text' file
+        for token, size in query.iter_hub_families():
+            yield token, [f'{size:,} members, see group file {group_file_path}']
+
+    @staticmethod
+    def build_format_for_hub_families(query) -> str:
+        """
+        Generator function which returns every hub family with its members, one line per family
+
+        :param query: RelatedPersonsQuery  built with a hub_threshold
+        :return: string (formatted), ex: "Smith (3 members): Tom Smith, Jake Smith-Scott, Emily Smith \n"
+        """
+        for token, size in query.iter_hub_families():
+            yield f'{token} ({size} members): {", ".join(query.iter_persons_with_token(token))} \n'
+
+    def write_hub_families_to_text_file(self, query, group_file_path: str):
+        """
+        Writes the members of the hub families to a txt file
+
+        :param query: RelatedPersonsQuery  built with a hub_threshold
+        :param group_file_path: string  path of the group txt file
         :return: text file
         """
-        related_names_data = GetRelatedPersons().get_related_names_data()
+        try:
+            with open(group_file_path, 'w') as group_file:
+                group_file.writelines(self.build_format_for_hub_families(query))
+        except IOError:
+            self.log.error(msg='Unable to access group txt file')
+
+    def write_related_names_data_to_text_file(self, related_names_data: dict = None,
+                                              input_file_path: str = "./persons_raw_data.csv",
+                                              output_file_path: str = 'related_persons_info.txt',
+                                              use_mmap: bool = False, cache: 'ResultCache' = None,
+                                              profiler: StageProfiler = None, reject_handler=None,
+                                              name_normaliser=None):
+        """
+        Writes the string received from Generator to 'related_persons_info.text' file
+        :param related_names_data: dict (received from get_related_names_data or RelatedPersonsQuery)
+        or iterable of (name, related names) pairs (received from RelatedPersonsStore)
+        Related names of all the persons in the input file are written when not given
+        :param input_file_path: string  path of the input csv file
+        :param output_file_path: string  path of the output txt file
+        :param use_mmap: boolean  True reads the input file memory mapped
+        :param cache: ResultCache  serves the output of an earlier run on unchanged input from disk when given
+        :param profiler: StageProfiler  profiles the read, filter, match and write stages when enabled
+        :param reject_handler: callable with params (line_number, rule, row), ex: RejectedRecordsWriter.
+        When given the input file is read and filtered in one pass and each rejected record is passed to it
+        :param name_normaliser: NameNormaliser  accepts and matches international names like Müller when given
+        :return: boolean
+        True if the output file was written or served from the cache
+        """
+        profiler = profiler or StageProfiler()
+        cache_key = None
+        if related_names_data is None and cache is not None:
+            cache_key = cache.get_key(file_paths=[input_file_path],
+                                      configuration=self.get_cache_configuration(name_normaliser=name_normaliser))
+            if cache_key is not None and cache.copy_cached_output(key=cache_key, output_file_path=output_file_path):
+                return True
+        if related_names_data is None and reject_handler is not None:
+            with profiler.stage('read_and_filter'):
+                items = FilterFields(name_normaliser=name_normaliser).get_filtered_first_lastname_details_single_pass(
+                    file_path=input_file_path, reject_handler=reject_handler)
+            with profiler.stage('match'):
+                related_names_data = GetRelatedPersons(name_normaliser=name_normaliser).get_related_names_data(
+                    items=items)
+        elif related_names_data is None:
+            with profiler.stage('read'):
+                if use_mmap:
+                    data = GetFirstNRecordsFromCSVFile().get_first_n_projected_records_from_mmap(
+                        count=1000, file_path=input_file_path)
+                else:
+                    data = GetFirstNRecordsFromCSVFile().get_first_n_records(count=1000, file_path=input_file_path)
+            with profiler.stage('filter'):
+                items = FilterFields(name_normaliser=name_normaliser).get_filtered_first_lastname_details(
+                    data=data, use_mmap=use_mmap)
+            with profiler.stage('match'):
+                related_names_data = GetRelatedPersons(name_normaliser=name_normaliser).get_related_names_data(
+                    items=items)
         matches = FormatAndWriteRelatedNamesToAFile.build_format_for_related_names(related_names_data)
+        written = True
         try:
-            with open('related_persons_info.txt', 'w') as output_file:
+            with profiler.stage('write'), open(output_file_path, 'w') as output_file:
                 for match in matches:
                     try:
                         output_file.write(match)
                     except OSError:
+                        written = False
                         self.log.error(msg="Error while writing to the Output text file")
             output_file.close()
         except IOError:
             self.log.error(msg='Unable to access output txt file')
+            return False
+        if not written:
+            return False
+        if cache_key is not None:
+            cache.store_output(key=cache_key, output_file_path=output_file_path)
         self.log.info(msg="Check out the output file for Related Persons details")
+        return True
+
+
+# Options every run mode of the command line supports
+COMMON_OPTIONS = {'input', 'output', 'international_names', 'strip_accents'}
+CACHE_OPTIONS = {'cache_dir', 'cache_max_mb', 'cache_max_age_hours'}
+# Run modes of the command line with a description and the options they support
+RUN_MODES = {
+    'manifest': ('--manifest', {'manifest', 'batch_processes', 'batch_report', 'international_names', 'strip_accents'}),
+    'store': ('--store', COMMON_OPTIONS | {'store', 'mmap', 'profile_dir'}),
+    'across_files': ('several input files, glob patterns, --cross-file-output, --hub-threshold, --graph-dir, '
+                     '--families-output or --relatives-of',
+                     COMMON_OPTIONS | CACHE_OPTIONS | {'mmap', 'workers', 'profile_dir', 'cross_file_output',
+                                                       'hub_threshold', 'group_output', 'graph_dir', 'families_output',
+                                                       'relatives_of', 'depth'}),
+    'reject_file': ('--reject-file', COMMON_OPTIONS | {'reject_file', 'profile_dir'}),
+    'checkpoint': ('--checkpoint-dir',
+                   COMMON_OPTIONS | {'checkpoint_dir', 'resume', 'checkpoint_every', 'count', 'mmap'}),
+    # The stages of a pipeline run in their own threads, the profiler only sees the main thread waiting for them
+    'pipeline': ('--pipeline', COMMON_OPTIONS | CACHE_OPTIONS | {'pipeline', 'validator_processes'}),
+    'single_file': ('a single input file', COMMON_OPTIONS | CACHE_OPTIONS | {'mmap', 'profile_dir'}),
+}
+# Options which have no effect without another option
+DEPENDENT_OPTIONS = {'strip_accents': 'international_names', 'cache_max_mb': 'cache_dir',
+                     'cache_max_age_hours': 'cache_dir', 'group_output': 'hub_threshold', 'depth': 'relatives_of',
+                     'resume': 'checkpoint_dir', 'checkpoint_every': 'checkpoint_dir', 'count': 'checkpoint_dir',
+                     'validator_processes': 'pipeline', 'batch_processes': 'manifest', 'batch_report': 'manifest'}
+
+
+def get_run_mode(args) -> str:
+    """
+    :param args: argparse.Namespace  parsed command line options
+    :return: string  key of RUN_MODES
+    """
+    if args.manifest:
+        return 'manifest'
+    if args.store:
+        return 'store'
+    if len(args.input) > 1 or any(char in args.input[0] for char in '*?[') or (
+            args.cross_file_output or args.graph_dir or args.hub_threshold is not None or args.families_output or
+            args.relatives_of):
+        return 'across_files'
+    if args.reject_file:
+        return 'reject_file'
+    if args.checkpoint_dir:
+        return 'checkpoint'
+    if args.pipeline:
+        return 'pipeline'
+    return 'single_file'
+
+
+def get_option_error(args, defaults: dict, run_mode: str) -> str:
+    """
+    :param args: argparse.Namespace  parsed command line options
+    :param defaults: dict  default value of every option
+    :param run_mode: string  key of RUN_MODES (received from get_run_mode)
+    :return: string  error message for the first option given that has no effect in the run mode. None if all apply
+    """
+    given_options = [option for option, value in vars(args).items() if value != defaults[option]]
+    description, supported_options = RUN_MODES[run_mode]
+    for option in given_options:
+        if option in DEPENDENT_OPTIONS and DEPENDENT_OPTIONS[option] not in given_options:
+            return f'--{option.replace("_", "-")} requires --{DEPENDENT_OPTIONS[option].replace("_", "-")}'
+    for option in given_options:
+        if option not in supported_options:
+            return f'--{option.replace("_", "-")} is not supported with {description}'
+    return None
+
+
+def main(argv: list = None, output_file_path: str = 'related_persons_info.txt'):
+    """
+    Command line entry point. Parses the options and writes the related persons to the output file
+    argparse is imported here to keep the imports of this module light
+
+    :param argv: list of command line arguments, sys.argv when not given
+    :param output_file_path: string  output file used when --output is not given
+    """
+    import argparse
+    parser = argparse.ArgumentParser(description='Finds related persons in a persons csv file')
+    parser.add_argument('--input', nargs='+', default=["./persons_raw_data.csv"],
+                        help='persons csv files or glob patterns, persons of all the files are matched together')
+    parser.add_argument('--output', default=output_file_path, help='related persons txt file')
+    parser.add_argument('--cross-file-output', help='txt file for persons related to persons in other files')
+    parser.add_argument('--mmap', action='store_true', help='memory map the input file, faster for large files')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='run read, filter, index, match and write stages concurrently with bounded queues')
+    parser.add_argument('--validator-processes', type=int, default=0,
+                        help='with --pipeline, number of worker processes validating the records')
+    parser.add_argument('--checkpoint-dir', help='save checkpoints of the run to this directory')
+    parser.add_argument('--resume', action='store_true',
+                        help='with --checkpoint-dir, continue from the last checkpoint')
+    parser.add_argument('--checkpoint-every', type=int,
+                        help='with --checkpoint-dir, records read or persons written between two checkpoints, '
+                             '100000 or a tenth of --count when not given')
+    parser.add_argument('--count', type=int,
+                        help='with --checkpoint-dir, number of records to read, all the records when not given')
+    parser.add_argument('--workers', type=int, help='number of input files read at the same time')
+    parser.add_argument('--cache-dir', help='serve repeated runs on unchanged input from this result cache directory')
+    parser.add_argument('--cache-max-mb', type=float, default=100, help='size cap of the result cache')
+    parser.add_argument('--cache-max-age-hours', type=float, default=168, help='age cap of the result cache entries')
+    parser.add_argument('--international-names', action='store_true',
+                        help='accept and match names in any script like Müller, normalised and case folded')
+    parser.add_argument('--strip-accents', action='store_true',
+                        help='with --international-names, match "Müller" with "Muller"')
+    parser.add_argument('--reject-file', help='csv file of the rejected records with line number and failed rule')
+    parser.add_argument('--store', help='load the persons into this SQLite database and export the output from it')
+    parser.add_argument('--hub-threshold', type=int,
+                        help='families larger than this are written once to the group file instead of as relatives')
+    parser.add_argument('--group-output', default='related_persons_groups.txt',
+                        help='with --hub-threshold, txt file listing the members of every hub family')
+    parser.add_argument('--graph-dir',
+                        help='also export the persons and relationships as .npy arrays to this directory')
+    parser.add_argument('--families-output',
+                        help='txt file of the families, persons related through any number of shared last names')
+    parser.add_argument('--relatives-of', help='print the persons within --depth hops of this "first last" name')
+    parser.add_argument('--depth', type=int, default=2, help='with --relatives-of, maximum number of hops')
+    parser.add_argument('--manifest',
+                        help='csv file of "input,output" rows, every input file is a job run on a warm worker pool')
+    parser.add_argument('--batch-processes', type=int,
+                        help='with --manifest, number of worker processes, the number of CPUs when not given')
+    parser.add_argument('--batch-report', help='with --manifest, csv file of the timing of every job')
+    parser.add_argument('--profile-dir', help='write cProfile, tracemalloc and sampled stack results of every stage')
+    args = parser.parse_args(argv)
+    if args.hub_threshold is not None and args.hub_threshold < 1:
+        parser.error('--hub-threshold must be at least 1')
+    if args.count is not None and args.count < 1 or args.checkpoint_every is not None and args.checkpoint_every < 1:
+        parser.error('--count and --checkpoint-every must be at least 1')
+    if args.workers is not None and args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.depth < 1:
+        parser.error('--depth must be at least 1')
+    run_mode = get_run_mode(args)
+    option_error = get_option_error(args, defaults=vars(parser.parse_args([])), run_mode=run_mode)
+    if option_error is not None:
+        parser.error(option_error)
+
+    profiler = StageProfiler(output_dir=args.profile_dir)
+    name_normaliser = None
+    if args.international_names:
+        from name_normalisation import NameNormaliser
+        name_normaliser = NameNormaliser(strip_accents=args.strip_accents)
+
+    cache = None
+    if args.cache_dir:
+        from result_cache import ResultCache
+        cache = ResultCache(cache_dir=args.cache_dir, max_size_bytes=int(args.cache_max_mb * 1024 * 1024),
+                            max_age_seconds=args.cache_max_age_hours * 3600)
+    if run_mode == 'manifest':
+        from batch_runner import BatchRunner
+        results = BatchRunner(manifest_path=args.manifest, processes=args.batch_processes,
+                              name_normaliser=name_normaliser).run(report_file_path=args.batch_report)
+        if any(result['error'] is not None for result in results):
+            sys.exit(1)
+        return
+    if run_mode == 'store':
+        from get_related_persons_across_files import GetRelatedPersonsAcrossFiles
+        from related_persons_store import RelatedPersonsStore
+        with RelatedPersonsStore(db_path=args.store, name_normaliser=name_normaliser) as store:
+            store.clear()
+            with profiler.stage('read_and_filter'):
+                for file_path in GetRelatedPersonsAcrossFiles.expand_file_paths(file_paths=args.input):
+                    items = FilterFields(name_normaliser=name_normaliser).get_filtered_first_lastname_details(
+                        file_path=file_path, use_mmap=args.mmap)
+                    store.load_persons(items=items, source=file_path, build_indexes=False)
+                store.build_indexes()
+            FormatAndWriteRelatedNamesToAFile().write_related_names_data_to_text_file(
+                related_names_data=store.iter_related_names_items(), output_file_path=args.output, profiler=profiler)
+        return
+    if run_mode == 'reject_file':
+        from write_rejected_records import RejectedRecordsWriter
+        with RejectedRecordsWriter(file_path=args.reject_file) as reject_handler:
+            FormatAndWriteRelatedNamesToAFile().write_related_names_data_to_text_file(
+                input_file_path=args.input[0], output_file_path=args.output, profiler=profiler,
+                reject_handler=reject_handler, name_normaliser=name_normaliser)
+        return
+    if run_mode == 'checkpoint':
+        from checkpointed_related_persons_run import CheckpointedRelatedPersonsRun
+        checkpoint_every = args.checkpoint_every
+        if checkpoint_every is None:
+            checkpoint_every = 100000 if args.count is None else max(min(100000, args.count // 10), 1)
+        CheckpointedRelatedPersonsRun(input_file_path=args.input[0], checkpoint_dir=args.checkpoint_dir,
+                                      count=args.count, checkpoint_every=checkpoint_every,
+                                      name_normaliser=name_normaliser).run(output_file_path=args.output,
+                                                                           resume=args.resume)
+        return
+    if run_mode == 'pipeline':
+        from related_persons_pipeline import RelatedPersonsPipeline
+        cache_key = cache and cache.get_key(file_paths=args.input, configuration=(
+            FormatAndWriteRelatedNamesToAFile().get_cache_configuration(name_normaliser=name_normaliser)))
+        if cache_key is not None and cache.copy_cached_output(key=cache_key, output_file_path=args.output):
+            return
+        succeeded = RelatedPersonsPipeline(input_file_path=args.input[0], validator_processes=args.validator_processes,
+                                           name_normaliser=name_normaliser).run(output_file_path=args.output)
+        if succeeded and cache_key is not None:
+            cache.store_output(key=cache_key, output_file_path=args.output)
+        return
+    if run_mode == 'single_file':
+        FormatAndWriteRelatedNamesToAFile().write_related_names_data_to_text_file(input_file_path=args.input[0],
+                                                                                  output_file_path=args.output,
+                                                                                  use_mmap=args.mmap, cache=cache,
+                                                                                  profiler=profiler,
+                                                                                  name_normaliser=name_normaliser)
+        return
+
+    from get_related_persons_across_files import GetRelatedPersonsAcrossFiles
+    related_persons_across_files = GetRelatedPersonsAcrossFiles(file_paths=args.input, use_mmap=args.mmap,
+                                                                max_workers=args.workers,
+                                                                name_normaliser=name_normaliser,
+                                                                hub_threshold=args.hub_threshold)
+    cache_key = None
+    if cache is not None and not (args.graph_dir or args.families_output or args.relatives_of):
+        file_paths = related_persons_across_files.file_paths
+        configuration = FormatAndWriteRelatedNamesToAFile().get_cache_configuration(
+            name_normaliser=name_normaliser, hub_threshold=args.hub_threshold, group_file_path=args.group_output)
+        cache_key = cache.get_key(file_paths=file_paths, configuration=configuration)
+        # The cross file output names the source files, the same content under other paths is a different entry
+        cross_file_cache_key = cache.get_key(file_paths=file_paths, configuration=dict(
+            configuration, output='cross_file', source_file_paths=file_paths))
+        group_cache_key = f'{cache_key}-groups'
+        if cache_key is not None and cache.copy_cached_output(key=cache_key, output_file_path=args.output) and (
+                not args.cross_file_output or cache.copy_cached_output(key=cross_file_cache_key,
+                                                                       output_file_path=args.cross_file_output)) and (
+                args.hub_threshold is None or cache.copy_cached_output(key=group_cache_key,
+                                                                       output_file_path=args.group_output)):
+            return
+    with profiler.stage('read_and_filter'):
+        related_persons_across_files.build_index()
+    with profiler.stage('match'):
+        related_names_data = related_persons_across_files.get_related_names_data()
+    if args.hub_threshold is not None:
+        query = related_persons_across_files.query
+        FormatAndWriteRelatedNamesToAFile().write_hub_families_to_text_file(query=query,
+                                                                            group_file_path=args.group_output)
+        related_names_data = chain(related_names_data.items(),
+                                   FormatAndWriteRelatedNamesToAFile.iter_hub_family_summaries(
+                                       query=query, group_file_path=args.group_output))
+    FormatAndWriteRelatedNamesToAFile().write_related_names_data_to_text_file(related_names_data=related_names_data,
+                                                                              output_file_path=args.output,
+                                                                              profiler=profiler)
+    if args.cross_file_output:
+        related_persons_across_files.write_cross_file_related_names_to_text_file(
+            output_file_path=args.cross_file_output)
+    if args.graph_dir:
+        from write_related_persons_graph import RelatedPersonsGraphWriter
+        RelatedPersonsGraphWriter(query=related_persons_across_files.query,
+                                  sources=related_persons_across_files.sources).write(output_dir=args.graph_dir)
+    if args.families_output or args.relatives_of:
+        from family_graph import FamilyGraph
+        with profiler.stage('family_graph'):
+            family_graph = FamilyGraph(query=related_persons_across_files.query)
+        if args.families_output:
+            with open(args.families_output, 'w') as families_file:
+                families_file.writelines(family_graph.build_format_for_families())
+        if args.relatives_of:
+            for name, depth in family_graph.get_relatives(name=args.relatives_of, max_depth=args.depth):
+                print(f'{depth}: {name}')
+    if cache_key is not None:
+        cache.store_output(key=cache_key, output_file_path=args.output)
+        if args.cross_file_output:
+            cache.store_output(key=cross_file_cache_key, output_file_path=args.cross_file_output)
+        if args.hub_threshold is not None:
+            cache.store_output(key=group_cache_key, output_file_path=args.group_output)
 
 
 if __name__ == "__main__":
     """
     Calls the function that initiates the operation of finding related persons
     """
-    FormatAndWriteRelatedNamesToAFile().write_related_names_data_to_text_file()
+    main()
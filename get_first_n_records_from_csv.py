@@ -1,5 +1,7 @@
-import csv
-from utils.customLogger import custom_logger as cl
+import mmap
+from itertools import islice
+from operator import itemgetter
+from utils.customLogger import LazyLogger
 import logging
 
 
@@ -9,42 +11,202 @@ class GetFirstNRecordsFromCSVFile:
     Class to read Persons raw data from a csv file and return the output as a list
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
 
     # Decorator
-    def read_data_from_csv(self) -> list:
+    def read_data_from_csv(self, file_path: str = "./persons_raw_data.csv", with_line_numbers: bool = False) -> list:
         """
         Decorator function to read lines in a given csv file
         Stops reading if there is blank or EOF
 
+        :param file_path: string  path of the input csv file
+        :param with_line_numbers: boolean  True returns tuples (line number where the record ends, record)
         :return: list of strings
         """
+        import csv
         try:
-            with open("./persons_raw_data.csv") as test_data:
+            with open(file_path) as test_data:
                 csv_reader = csv.reader(test_data)
                 next(csv_reader)  # Filters header line
                 for line in csv_reader:
-                    if line:
-                        yield line
-                    else:
+                    if not line:
                         break
+                    if with_line_numbers:
+                        yield csv_reader.line_num, line
+                    else:
+                        yield line
             test_data.close()
         except IOError:
             self.log.error(msg='Unable to access input data file')
 
-    def get_first_n_records(self, count: int) -> list:
+    def get_first_n_records(self, count: int, file_path: str = "./persons_raw_data.csv") -> list:
         """
         Gets the first 'count' records or all records if less than 'count' from input file
 
         :param count: int  number of person records
+        :param file_path: string  path of the input csv file
         :return: list of maximum 'count' items. Each item is a list i.e. each person details
         """
         person_details = []
         counter = 0
-        record = self.read_data_from_csv()
+        record = self.read_data_from_csv(file_path=file_path)
         for row in record:
             if counter < count:
                 person_details.append(row)
                 counter += 1
         self.log.info(msg=f'Collected {len(person_details)} records')
         return person_details
+
+    @staticmethod
+    def split_csv_record(buffer, start: int, end: int) -> tuple:
+        """
+        Finds the field boundaries of one csv record over raw bytes, same as 'csv' library with default dialect
+        Records without a quote char are split directly, quoted fields like "Riebesell, H F Jr" are scanned
+        and can contain delimiters, doubled quotes and line breaks
+
+        :param buffer: bytes like object, ex: mmap of the input file
+        :param start: int  offset of the first byte of the record
+        :param end: int  offset where the data ends
+        :return: tuple (list of fields as bytes, offset of the next record)
+        """
+        line_end = buffer.find(b'\n', start, end)
+        if line_end == -1:
+            line_end = end
+        line = buffer[start:line_end]
+        if b'"' not in line:
+            return line.rstrip(b'\r').split(b','), line_end + 1
+
+        fields = []
+        position = start
+        while True:
+            parts = []
+            if position < end and buffer[position] == ord('"'):
+                position += 1
+                while True:
+                    quote = buffer.find(b'"', position, end)
+                    if quote == -1:
+                        parts.append(buffer[position:end])
+                        position = end
+                        break
+                    parts.append(buffer[position:quote])
+                    if buffer[quote + 1:quote + 2] == b'"':
+                        parts.append(b'"')
+                        position = quote + 2
+                    else:
+                        position = quote + 1
+                        break
+            if position > line_end:
+                line_end = buffer.find(b'\n', position, end)
+                if line_end == -1:
+                    line_end = end
+            comma = buffer.find(b',', position, line_end)
+            if comma == -1:
+                parts.append(buffer[position:line_end].rstrip(b'\r'))
+                fields.append(b''.join(parts))
+                return fields, line_end + 1
+            parts.append(buffer[position:comma])
+            fields.append(b''.join(parts))
+            position = comma + 1
+
+    @staticmethod
+    def split_quoted_csv_line(line: bytes) -> list:
+        """
+        Splits one line having quoted fields like "Riebesell, H F Jr" without scanning it byte by byte
+        Splits on quote char first, the parts outside the quotes are split on delimiter
+
+        :param line: bytes  one line of csv file without line break
+        :return: list of fields as bytes.
+        None if a quoted field continues on the next line or the line is not quoted properly,
+        use 'split_csv_record' then
+        """
+        parts = line.rstrip(b'\r').split(b'"')
+        if len(parts) % 2 == 0:
+            return None
+        fields = parts[0].split(b',')
+        i = 1
+        while i < len(parts):
+            if fields[-1]:
+                return None
+            field = parts[i]
+            while i + 2 < len(parts) and not parts[i + 1]:  # doubled quote inside quoted field
+                field += b'"' + parts[i + 2]
+                i += 2
+            following_fields = parts[i + 1].split(b',')
+            if following_fields[0]:
+                return None
+            fields[-1] = field
+            fields.extend(following_fields[1:])
+            i += 2
+        return fields
+
+    def read_raw_data_from_mmap(self, file_path: str = "./persons_raw_data.csv", start_offset: int = 0,
+                                chunk_size: int = 1 << 20):
+        """
+        Generator function which memory maps the csv file and returns its records as raw bytes, without decoding
+        Lines are split a chunk at a time, only the lines having quote char need scanning field by field
+        Skips the header line when reading from the start. Stops reading if there is blank or EOF
+
+        :param file_path: string  path of the input csv file
+        :param start_offset: int  offset of the first record to read, 0 reads the file from the start
+        :param chunk_size: int  approximate number of bytes split into lines at once
+        :return: tuple (list of fields as bytes, offset of the next record)
+        """
+        try:
+            with open(file_path, 'rb') as test_data:
+                try:
+                    buffer = mmap.mmap(test_data.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:  # empty file can not be mapped
+                    return
+                with buffer:
+                    end = len(buffer)
+                    position = start_offset
+                    if position == 0:
+                        _, position = self.split_csv_record(buffer, 0, end)  # Filters header line
+                    while position < end:
+                        chunk_end = buffer.find(b'\n', min(position + chunk_size, end - 1))
+                        if chunk_end == -1:
+                            chunk_end = end
+                        for line in buffer[position:chunk_end].split(b'\n'):
+                            if not line or line == b'\r':
+                                return
+                            next_position = position + len(line) + 1
+                            if b'"' not in line:
+                                fields = line.rstrip(b'\r').split(b',')
+                            else:
+                                fields = self.split_quoted_csv_line(line)
+                                if fields is None:
+                                    fields, record_end = self.split_csv_record(buffer, position, end)
+                                    if record_end != next_position:  # quoted field continues on next lines
+                                        yield fields, record_end
+                                        position = record_end
+                                        break
+                            yield fields, next_position
+                            position = next_position
+        except IOError:
+            self.log.error(msg='Unable to access input data file')
+
+    def get_first_n_projected_records_from_mmap(self, count: int, file_path: str = "./persons_raw_data.csv",
+                                                fields: tuple = (0, 1, 9), max_field_length: int = 257) -> list:
+        """
+        Gets the first 'count' records or all records if less than 'count' from memory mapped input file
+        Same as 'get_first_n_records' followed by FilterFields 'get_data_with_fields_length_less_than_257' and
+        'get_data_with_only_first_lastname_email', but decodes the projected fields only
+
+        :param count: int  number of person records
+        :param file_path: string  path of the input csv file
+        :param fields: tuple  positions of the fields to keep, default first_name, last_name and email
+        :param max_field_length: int  records having any field longer than this are filtered
+        :return: list of items. Each item is a list of the projected fields of a person
+        """
+        person_details = []
+        counter = 0
+        get_fields = itemgetter(*fields)
+        for row, _ in islice(self.read_raw_data_from_mmap(file_path=file_path), count):
+            counter += 1
+            if max(map(len, row)) > max_field_length and any(
+                    len(field.decode('utf-8', 'replace')) > max_field_length for field in row):
+                continue
+            person_details.append([field.decode('utf-8') for field in get_fields(row)])
+        self.log.info(msg=f'Collected {counter} records, {len(person_details)} of them have fields less than '
+                          f'the length of {max_field_length + 1}')
+        return person_details
@@ -1,4 +1,4 @@
-from utils.customLogger import custom_logger as cl
+from utils.customLogger import LazyLogger
 import logging
 from filter_fields import FilterFields
 
@@ -11,7 +11,28 @@ class GetRelatedPersons:
     defined in requirements document
     """
 
-    log = cl(log_level=logging.INFO)
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, name_normaliser=None, prune_singletons: bool = True, token_count_memory_bytes: int = None):
+        """
+        :param name_normaliser: NameNormaliser  matches normalised last names when given, ex: "MÜLLER" with "Müller"
+        :param prune_singletons: boolean  True drops the persons whose last name tokens all appear once
+        before comparing, they can not be related to anyone
+        :param token_count_memory_bytes: int  counts the tokens approximately within this memory, with CountMinSketch.
+        Tokens are counted exactly when not given
+        """
+        self.name_normaliser = name_normaliser
+        self.prune_singletons = prune_singletons
+        self.token_count_memory_bytes = token_count_memory_bytes
+
+    def get_last_name_tokens(self, last_name: str) -> list:
+        """
+        :param last_name: string, ex: "William-Scott"
+        :return: list of parts of the hyphenated last name, normalised when there is a name_normaliser
+        """
+        if self.name_normaliser is not None:
+            return list(self.name_normaliser.get_last_name_tokens(last_name))
+        return self.split_last_name(last_name=last_name, split_char='-')
 
     def split_last_name(self, last_name: str, split_char: str) -> list:
         """
@@ -45,23 +66,64 @@ class GetRelatedPersons:
         self.log.info(msg=f'{len(filtered_names)} keys filtered out of {len(names)} keys have values')
         return filtered_names
 
-    def get_related_names_data(self) -> dict:
+    def get_token_counts(self, items: list):
+        """
+        Counts the persons having each last name token
+
+        :param items: list of items. Each item is a list consisting of first_name, last_name
+        :return: Counter, or CountMinSketch when token_count_memory_bytes is given. Indexed by token
+        """
+        if self.token_count_memory_bytes is None:
+            from collections import Counter
+            token_counts = Counter()
+            for item in items:
+                token_counts.update(set(self.get_last_name_tokens(last_name=item[1])))
+            return token_counts
+        from count_min_sketch import CountMinSketch
+        token_counts = CountMinSketch(memory_bytes=self.token_count_memory_bytes)
+        for item in items:
+            for token in set(self.get_last_name_tokens(last_name=item[1])):
+                token_counts.add(token)
+        return token_counts
+
+    def get_items_with_shared_tokens(self, items: list) -> list:
+        """
+        Drops the persons whose last name tokens all appear once in the items, in a second pass over the items.
+        The related names data is the same with or without them
+
+        :param items: list of items. Each item is a list consisting of first_name, last_name
+        :return: list of items in the same order
+        """
+        token_counts = self.get_token_counts(items=items)
+        items_with_shared_tokens = [item for item in items
+                                    if any(token_counts[token] > 1
+                                           for token in self.get_last_name_tokens(last_name=item[1]))]
+        self.log.info(msg=f'{len(items) - len(items_with_shared_tokens)} out of {len(items)} persons '
+                          f'have no last name token in common with others')
+        return items_with_shared_tokens
+
+    def get_related_names_data(self, items: list = None) -> dict:
         """
         Takes one name at a time and compares its last name with the last names next in the order in the list
         The improvement over the solution1 is it compares two names in a list only once
+        :param items: list of items (received from 'get_filtered_first_lastname_details').
+        Read and filtered from the input file when not given
         :return: dict with the values having last name matching with the last name in the respective key
         """
-        items = FilterFields().get_filtered_first_lastname_details()
+        if items is None:
+            items = FilterFields().get_filtered_first_lastname_details()
+        if self.prune_singletons:
+            items = self.get_items_with_shared_tokens(items=items)
         related_names_dict = {}
         for i in range(0, len(items)):
             k = ' '.join([items[i][0], items[i][1]])
             last_name = []
             if k not in related_names_dict:
                 related_names_dict[k] = []
-            last_name.extend(self.split_last_name(last_name=items[i][1], split_char='-'))
+            last_name.extend(self.get_last_name_tokens(last_name=items[i][1]))
 
             for j in range(i + 1, len(items)):
-                another_last_name = self.split_last_name(last_name=items[j][1], split_char='-')
+                another_last_name = self.get_last_name_tokens(last_name=items[j][1])
                 match = [x for x in last_name if x in another_last_name]
                 j = ' '.join([items[j][0], items[j][1]])
                 if match:
@@ -0,0 +1,129 @@
+import glob
+import os
+from concurrent.futures import ThreadPoolExecutor
+from utils.customLogger import LazyLogger
+import logging
+from filter_fields import FilterFields
+from related_persons_query import RelatedPersonsQuery
+
+
+# Reads person data split across many csv files and finds related persons in all of them together
+class GetRelatedPersonsAcrossFiles:
+    """
+    GetRelatedPersonsAcrossFiles class reads and filters a list of csv files or glob patterns concurrently,
+    tags every person with its source file and indexes all of them in one shared last name token index.
+    Related persons are found across the files as if the files were concatenated,
+    the cost grows with the total number of persons, not with the number of file pairs
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, file_paths: list, use_mmap: bool = False, max_workers: int = None, name_normaliser=None,
+                 hub_threshold: int = None):
+        """
+        :param file_paths: list of csv file paths or glob patterns, ex: ["./regions/*.csv", "./persons_raw_data.csv"]
+        :param use_mmap: boolean  True reads the input files memory mapped
+        :param max_workers: int  number of files read at the same time, default is decided by ThreadPoolExecutor
+        :param name_normaliser: NameNormaliser  accepts and matches international names when given
+        :param hub_threshold: int  families larger than this are not expanded into related persons
+        """
+        self.file_paths = self.expand_file_paths(file_paths=file_paths)
+        self.use_mmap = use_mmap
+        self.max_workers = max_workers
+        self.name_normaliser = name_normaliser
+        self.hub_threshold = hub_threshold
+        self.sources = []
+        self.query = None
+
+    @classmethod
+    def expand_file_paths(cls, file_paths: list) -> list:
+        """
+        Expands glob patterns. Each file is kept once, in the given order, matches of a pattern are sorted
+
+        :param file_paths: list of csv file paths or glob patterns
+        :return: list of csv file paths
+        """
+        expanded_file_paths = {}
+        for file_path in file_paths:
+            matches = sorted(glob.glob(file_path)) if glob.has_magic(file_path) else [file_path]
+            if not matches:
+                cls.log.error(msg=f'No input data file matches {file_path}')
+            for match in matches:
+                expanded_file_paths[os.path.normpath(match)] = None
+        return list(expanded_file_paths)
+
+    def get_filtered_records_of_file(self, file_path: str) -> list:
+        """
+        Reads and filters one file. The first 1000 records of each file are considered
+
+        :param file_path: string  path of the csv file
+        :return: list of items (same as 'get_filtered_first_lastname_details')
+        """
+        return FilterFields(name_normaliser=self.name_normaliser).get_filtered_first_lastname_details(
+            file_path=file_path, use_mmap=self.use_mmap)
+
+    def build_index(self) -> RelatedPersonsQuery:
+        """
+        Reads the files concurrently and indexes the persons of all the files in input order, once
+
+        :return: RelatedPersonsQuery  the shared index
+        """
+        if self.query is not None:
+            return self.query
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            filtered_records = list(executor.map(self.get_filtered_records_of_file, self.file_paths))
+        self.query = RelatedPersonsQuery(items=[], name_normaliser=self.name_normaliser,
+                                         hub_threshold=self.hub_threshold)
+        for file_path, items in zip(self.file_paths, filtered_records):
+            for item in items:
+                self.query.add_person(first_name=item[0], last_name=item[1])
+                self.sources.append(file_path)
+        self.query.build_index()
+        self.log.info(msg=f'Indexed {len(self.sources)} persons from {len(self.file_paths)} files')
+        return self.query
+
+    def get_related_names_data(self) -> dict:
+        """
+        Gets the related names of the persons of all the files
+
+        :return: dict same as GetRelatedPersons.get_related_names_data for the concatenated files
+        """
+        return self.build_index().get_related_names_data()
+
+    def iter_cross_file_related_names(self):
+        """
+        Generator function which returns the persons having related persons in other files, in input order
+
+        :return: tuple (name, source file, list of tuples (related name, source file))
+        """
+        query = self.build_index()
+        for person_id, name in enumerate(query.names):
+            related_names = [(query.names[other_id], self.sources[other_id])
+                             for other_id in query.iter_related_ids(person_id)
+                             if self.sources[other_id] != self.sources[person_id]]
+            if related_names:
+                yield name, self.sources[person_id], related_names
+
+    def build_format_for_cross_file_related_names(self) -> str:
+        """
+        Generator function which returns string in the expected output, with source file of every person
+
+        :return: string (formatted), ex: "Tom William (east.csv): Jake Scott-William (west.csv) \n"
+        """
+        for name, source, related_names in self.iter_cross_file_related_names():
+            matched_names = ', '.join([f'{other_name} ({other_source})' for other_name, other_source in related_names])
+            yield f'{name} ({source}): {matched_names} \n'
+
+    def write_cross_file_related_names_to_text_file(self, output_file_path: str):
+        """
+        Writes the persons related across files to a txt file
+
+        :param output_file_path: string  path of the output txt file
+        :return: text file
+        """
+        try:
+            with open(output_file_path, 'w') as output_file:
+                output_file.writelines(self.build_format_for_cross_file_related_names())
+        except IOError:
+            self.log.error(msg='Unable to access cross file output txt file')
+        self.log.info(msg="Check out the cross file output for Related Persons in different files")
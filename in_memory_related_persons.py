@@ -0,0 +1,196 @@
+from itertools import islice
+from utils.customLogger import LazyLogger
+import logging
+from filter_fields import FilterFields, NAME_WITH_ATLEAST_ONE_ALPHA, NAME_WITH_ALPHA_OR_SPACE_HYPHEN_ONLY
+from get_related_persons import GetRelatedPersons
+from related_persons_query import RelatedPersonsQuery
+
+
+# Finds related persons in person data already in memory, without writing and reading a csv file
+class InMemoryRelatedPersons:
+    """
+    InMemoryRelatedPersons class applies the FilterFields validation rules and finds related persons in:
+        pandas DataFrame            rules are applied column at a time with the vectorised Series.str methods
+        pyarrow Table               rules are applied column at a time with the vectorised pyarrow.compute functions
+        dict of columns             ex: {"first_name": [...], "last_name": [...], "email": [...]}, checked row by row
+        iterable of dicts           ex: rows fetched from a database
+        iterable of lists           in the csv field order, ex: rows of persons_raw_data.csv without the header
+    Only the first_name, last_name and email columns are required, every column is checked by the length rule.
+    The results are Python objects, same as for the csv input file
+
+    Usage:
+        InMemoryRelatedPersons().get_related_names_data(data=data_frame)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, first_name_column: str = 'first_name', last_name_column: str = 'last_name',
+                 email_column: str = 'email', count: int = None, name_normaliser=None):
+        """
+        :param first_name_column: string  name of the first_name column or key
+        :param last_name_column: string  name of the last_name column or key
+        :param email_column: string  name of the email column or key
+        :param count: int  number of person records to consider, all the records when not given
+        :param name_normaliser: NameNormaliser  accepts and matches international names when given
+        """
+        self.first_name_column = first_name_column
+        self.last_name_column = last_name_column
+        self.email_column = email_column
+        self.count = count
+        self.name_normaliser = name_normaliser
+        self.filter_fields = FilterFields(name_normaliser=name_normaliser)
+
+    @property
+    def columns(self) -> list:
+        return [self.first_name_column, self.last_name_column, self.email_column]
+
+    @staticmethod
+    def is_data_frame(data) -> bool:
+        return hasattr(data, 'columns') and hasattr(data, 'iloc')
+
+    @staticmethod
+    def is_arrow_table(data) -> bool:
+        return hasattr(data, 'column_names') and hasattr(data, 'to_pydict')
+
+    def get_filtered_first_lastname_details(self, data) -> list:
+        """
+        Applies all the validation rules on the persons
+
+        :param data: DataFrame, pyarrow Table, dict of columns, iterable of dicts or iterable of lists
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        if self.is_data_frame(data):
+            return self.get_filtered_first_lastname_details_of_data_frame(data_frame=data)
+        if self.is_arrow_table(data):
+            return self.get_filtered_first_lastname_details_of_arrow_table(table=data)
+        if isinstance(data, dict):
+            return self.get_filtered_first_lastname_details_of_columns(columns=data)
+        return self.get_filtered_first_lastname_details_of_records(records=data)
+
+    def get_filtered_first_lastname_details_of_data_frame(self, data_frame) -> list:
+        """
+        :param data_frame: pandas DataFrame having the first_name, last_name and email columns
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        if any(column not in data_frame.columns for column in self.columns):
+            self.log.error(msg=f'Person data does not have all the columns {self.columns}')
+            return []
+        if self.count is not None:
+            data_frame = data_frame.iloc[:self.count]
+        first_name, last_name, email = (data_frame[column].fillna('').astype(str) for column in self.columns)
+        passed = (first_name != '') & (last_name != '') & (email != '')
+        for column in data_frame.columns:
+            passed &= ~(data_frame[column].fillna('').astype(str).str.len() > 257)
+        if self.name_normaliser is None:
+            for name in (first_name, last_name):
+                passed &= name.str.contains(NAME_WITH_ATLEAST_ONE_ALPHA.pattern)
+                passed &= name.str.fullmatch(NAME_WITH_ALPHA_OR_SPACE_HYPHEN_ONLY.pattern)
+        else:
+            for name in (first_name, last_name):
+                passed &= name.map(self.name_normaliser.is_name_with_atleast_one_alpha).astype(bool)
+                passed &= name.map(self.name_normaliser.is_name_with_allowed_chars_only).astype(bool)
+        # Email validation can not be vectorised, only the emails of the persons passing the other rules are validated
+        passed &= email.where(passed, '').map(lambda value: bool(value) and FilterFields.is_valid_email(value))
+        items = [[first, last] for first, last in zip(first_name[passed], last_name[passed])]
+        self.log.info(msg=f'{len(items)} out of {len(data_frame)} records passed filtering')
+        return items
+
+    def get_filtered_first_lastname_details_of_arrow_table(self, table) -> list:
+        """
+        :param table: pyarrow Table having the first_name, last_name and email columns
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        import pyarrow
+        import pyarrow.compute as pc
+        if any(column not in table.column_names for column in self.columns):
+            self.log.error(msg=f'Person data does not have all the columns {self.columns}')
+            return []
+        if self.count is not None:
+            table = table.slice(0, self.count)
+        strings = {column: pc.fill_null(pc.cast(table[column], pyarrow.string()), '') for column in table.column_names}
+        first_name, last_name, email = (strings[column] for column in self.columns)
+        passed = pc.and_(pc.and_(pc.not_equal(first_name, ''), pc.not_equal(last_name, '')), pc.not_equal(email, ''))
+        for column in strings.values():
+            passed = pc.and_(passed, pc.less_equal(pc.utf8_length(column), 257))
+        if self.name_normaliser is None:
+            for name in (first_name, last_name):
+                passed = pc.and_(passed, pc.match_substring_regex(name, NAME_WITH_ATLEAST_ONE_ALPHA.pattern))
+                passed = pc.and_(passed, pc.match_substring_regex(name, NAME_WITH_ALPHA_OR_SPACE_HYPHEN_ONLY.pattern))
+        else:
+            for name in (first_name, last_name):
+                passed = pc.and_(passed, pyarrow.array(
+                    [bool(self.name_normaliser.is_name_with_atleast_one_alpha(value)
+                          and self.name_normaliser.is_name_with_allowed_chars_only(value))
+                     for value in name.to_pylist()], type=pyarrow.bool_()))
+        # Email validation can not be vectorised, only the emails of the persons passing the other rules are validated
+        items = [[first, last] for first, last, person_email in zip(*(pc.filter(column, passed).to_pylist()
+                                                                      for column in (first_name, last_name, email)))
+                 if FilterFields.is_valid_email(person_email)]
+        self.log.info(msg=f'{len(items)} out of {table.num_rows} records passed filtering')
+        return items
+
+    def get_filtered_first_lastname_details_of_columns(self, columns: dict) -> list:
+        """
+        :param columns: dict of equal length columns, ex: {"first_name": ["Tom"], "last_name": ["William"], ...}
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        if any(column not in columns for column in self.columns):
+            self.log.error(msg=f'Person data does not have all the columns {self.columns}')
+            return []
+        names = list(columns)
+        return self.get_filtered_first_lastname_details_of_records(
+            records=(dict(zip(names, values)) for values in zip(*columns.values())))
+
+    def get_first_failing_rule_of_record(self, record) -> str:
+        """
+        :param record: dict with the first_name, last_name and email keys, or list in the csv field order
+        :return: string  name of the first rule in FilterFields.rules the record fails. None if the record passes all
+        """
+        if not isinstance(record, dict):
+            return self.filter_fields.get_first_failing_rule(['' if field is None else str(field) for field in record])
+        if any(column not in record for column in self.columns):
+            return 'missing_fields'
+        fields = {key: '' if value is None else str(value) for key, value in record.items()}
+        return self.filter_fields.get_first_failing_rule_of_person(first_name=fields[self.first_name_column],
+                                                                   last_name=fields[self.last_name_column],
+                                                                   email=fields[self.email_column],
+                                                                   fields=list(fields.values()))
+
+    def get_filtered_first_lastname_details_of_records(self, records) -> list:
+        """
+        :param records: iterable of dicts or of lists in the csv field order
+        :return: list of items. Each item is a list consisting of first_name, last_name only
+        """
+        items = []
+        rejected_counts = dict.fromkeys(FilterFields.rules, 0)
+        for record in islice(records, self.count):
+            rule = self.get_first_failing_rule_of_record(record=record)
+            if rule is not None:
+                rejected_counts[rule] += 1
+            elif isinstance(record, dict):
+                items.append([str(record[self.first_name_column]), str(record[self.last_name_column])])
+            else:
+                items.append([str(record[0]), str(record[1])])
+        for rule, rejected_count in rejected_counts.items():
+            if rejected_count:
+                self.log.info(msg=f'{rejected_count} records rejected by {rule} rule')
+        self.log.info(msg=f'{len(items)} records passed filtering')
+        return items
+
+    def get_related_names_data(self, data) -> dict:
+        """
+        :param data: DataFrame, pyarrow Table, dict of columns, iterable of dicts or iterable of lists
+        :return: dict same as GetRelatedPersons.get_related_names_data
+        """
+        items = self.get_filtered_first_lastname_details(data=data)
+        return GetRelatedPersons(name_normaliser=self.name_normaliser).get_related_names_data(items=items)
+
+    def get_related_persons_query(self, data) -> RelatedPersonsQuery:
+        """
+        :param data: DataFrame, pyarrow Table, dict of columns, iterable of dicts or iterable of lists
+        :return: RelatedPersonsQuery  for selective queries on the persons passing filtering
+        """
+        query = RelatedPersonsQuery(items=self.get_filtered_first_lastname_details(data=data),
+                                    name_normaliser=self.name_normaliser)
+        query.build_index()
+        return query
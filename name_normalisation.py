@@ -0,0 +1,107 @@
+import re
+import unicodedata
+from functools import lru_cache
+
+# Dash and apostrophe variants written as the ASCII ones before validating and matching
+PUNCTUATION_TABLE = str.maketrans({'\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-',
+                                   '\u2212': '-', '\u2019': "'", '\u02bc': "'", '\u00b4': "'"})
+# Letters without a decomposition to a base letter
+ACCENT_EXCEPTIONS = {'ø': 'o', 'đ': 'd', 'ħ': 'h', 'ı': 'i', 'ł': 'l', 'ŧ': 't', 'æ': 'ae', 'œ': 'oe', 'þ': 'th'}
+
+NAME_WITH_ATLEAST_ONE_LETTER = re.compile(r'[^\W\d_]')
+# Letters of any script, combining accents, space, hyphen and apostrophe
+NAME_WITH_ALLOWED_CHARS_ONLY = re.compile(r"(?:[^\W\d_]|[\u0300-\u036f \-'])*")
+
+
+def build_accent_table() -> dict:
+    """
+    Builds str.translate table from accented latin letters to their base letters, ex: "ü" to "u"
+
+    :return: dict  code point of accented letter as key, base letters as value
+    """
+    accent_table = {}
+    for code_point in range(0x00c0, 0x0250):
+        char = chr(code_point)
+        base = ''.join(c for c in unicodedata.normalize('NFKD', char) if not unicodedata.combining(c))
+        if base != char and base.isascii():
+            accent_table[code_point] = base
+    accent_table.update({ord(char): base for char, base in ACCENT_EXCEPTIONS.items()})
+    return accent_table
+
+
+ACCENT_TABLE = build_accent_table()
+
+
+# Normalises international names for validation and matching
+class NameNormaliser:
+    """
+    NameNormaliser class validates and normalises names written in any script like Müller, O'Brien-Núñez or Zoë.
+    Names are NFKC normalised and case folded, accents are optionally stripped.
+    The normalised forms and last name tokens are cached, ASCII names skip unicode normalisation
+
+    Usage:
+        FilterFields(name_normaliser=NameNormaliser(strip_accents=True))
+    """
+
+    def __init__(self, strip_accents: bool = False, cache_size: int = 1 << 16):
+        """
+        :param strip_accents: boolean  True matches "Müller" with "Muller"
+        :param cache_size: int  number of normalised names kept
+        """
+        self.strip_accents = strip_accents
+        self.cache_size = cache_size
+        self.normalise = lru_cache(maxsize=cache_size)(self._normalise)
+        self.get_last_name_tokens = lru_cache(maxsize=cache_size)(self._get_last_name_tokens)
+
+    def __reduce__(self):
+        # Sent to worker processes with its settings only, the caches are rebuilt there
+        return self.__class__, (self.strip_accents, self.cache_size)
+
+    @property
+    def configuration(self) -> dict:
+        """
+        :return: dict of settings changing the result, ex: part of ResultCache key
+        """
+        return {'normalisation': 'NFKC casefold', 'strip_accents': self.strip_accents}
+
+    def _normalise(self, name: str) -> str:
+        """
+        :param name: string, ex: "O’Brien-NÚÑEZ"
+        :return: string, ex: "o'brien-núñez" or "o'brien-nunez" when accents are stripped
+        """
+        if name.isascii():
+            return name.lower()
+        name = unicodedata.normalize('NFKC', name.translate(PUNCTUATION_TABLE)).casefold()
+        if self.strip_accents:
+            name = name.translate(ACCENT_TABLE)
+            if not name.isascii():
+                name = ''.join(c for c in unicodedata.normalize('NFKD', name) if not unicodedata.combining(c))
+        return name
+
+    def _get_last_name_tokens(self, last_name: str) -> tuple:
+        """
+        :param last_name: string, ex: "O'Brien-Núñez"
+        :return: tuple of normalised parts of the hyphenated last name, ex: ("o'brien", "núñez")
+        """
+        return tuple(dict.fromkeys(self.normalise(last_name).split('-')))
+
+    @staticmethod
+    def is_name_with_atleast_one_alpha(name: str) -> bool:
+        """
+        :param name: string  first_name or last_name
+        :return: boolean
+        True if the name contains a letter of any script
+        """
+        return NAME_WITH_ATLEAST_ONE_LETTER.search(name) is not None
+
+    @staticmethod
+    def is_name_with_allowed_chars_only(name: str) -> bool:
+        """
+        :param name: string  first_name or last_name
+        :return: boolean
+        True if the name contains letters of any script, space, hyphen and apostrophe only
+        """
+        if name.isascii():
+            return NAME_WITH_ALLOWED_CHARS_ONLY.fullmatch(name) is not None
+        name = unicodedata.normalize('NFKC', name.translate(PUNCTUATION_TABLE))
+        return NAME_WITH_ALLOWED_CHARS_ONLY.fullmatch(name) is not None
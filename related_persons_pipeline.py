@@ -0,0 +1,184 @@
+import queue
+import threading
+import time
+from collections import deque
+from itertools import islice
+from utils.customLogger import LazyLogger
+import logging
+from get_first_n_records_from_csv import GetFirstNRecordsFromCSVFile
+from filter_fields import FilterFields
+from related_persons_query import RelatedPersonsQuery
+from format_and_write_relatednames_to_file import FormatAndWriteRelatedNamesToAFile
+
+# Put in a queue after the last batch
+END_OF_STAGE = object()
+# FilterFields of a validator worker process
+_worker_filter_fields = None
+
+
+def _init_validator_worker(name_normaliser=None):
+    global _worker_filter_fields
+    _worker_filter_fields = FilterFields(name_normaliser=name_normaliser)
+
+
+def _validate_batch(batch: list) -> list:
+    """
+    :param batch: list of person records as read from csv file
+    :return: list of items passing all the validation rules. Each item is a list consisting of first_name, last_name
+    """
+    return [row[0:2] for row in batch if _worker_filter_fields.get_first_failing_rule(row) is None]
+
+
+# Runs read, filter, index and write stages concurrently, connected by bounded queues
+class RelatedPersonsPipeline:
+    """
+    RelatedPersonsPipeline class runs the stages in their own threads connected by bounded queues of batches:
+        reader -> validator -> indexer, then matcher -> writer
+    A stage blocks when the queue to the next stage is full, so a slow stage holds back the stages before it
+    instead of buffering the whole file. Reading, validating and indexing overlap, as do matching and writing.
+    Matching starts once every person is indexed, the order of the output depends on all the persons.
+    The stages share one interpreter, validation can run in worker processes to run alongside reading and indexing.
+    The output is the same as FormatAndWriteRelatedNamesToAFile.write_related_names_data_to_text_file
+
+    Usage:
+        RelatedPersonsPipeline(input_file_path='./persons_raw_data.csv').run(output_file_path='related_persons_info.txt')
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, input_file_path: str = "./persons_raw_data.csv", count: int = 1000, batch_size: int = 256,
+                 queue_size: int = 8, validator_processes: int = 0, name_normaliser=None):
+        """
+        :param input_file_path: string  path of the input csv file
+        :param count: int  number of person records to consider
+        :param batch_size: int  number of records or lines passed between stages at once
+        :param queue_size: int  number of batches a queue holds before the stage putting to it waits
+        :param validator_processes: int  number of worker processes validating the batches, 0 validates in a thread
+        :param name_normaliser: NameNormaliser  accepts and matches international names when given
+        """
+        self.input_file_path = input_file_path
+        self.count = count
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.validator_processes = validator_processes
+        self.name_normaliser = name_normaliser
+        self.stage_seconds = {}
+        self.errors = []
+
+    def iter_batches(self, iterable):
+        iterator = iter(iterable)
+        while True:
+            batch = list(islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def iter_queue(input_queue: queue.Queue):
+        """
+        Generator function which returns the batches put in the queue until the end of the stage before
+        """
+        while True:
+            batch = input_queue.get()
+            if batch is END_OF_STAGE:
+                return
+            yield batch
+
+    def _run_stage(self, name: str, stage, input_queue: queue.Queue = None, output_queue: queue.Queue = None):
+        """
+        Runs a stage and always ends its output queue. A failed stage keeps draining its input queue
+        so the stages before it are not blocked on a full queue
+        """
+        start = time.perf_counter()
+        try:
+            stage()
+        except Exception as error:
+            self.log.error(msg=f'{name} stage of the pipeline failed: {error!r}')
+            self.errors.append((name, error))
+            if input_queue is not None:
+                for _ in self.iter_queue(input_queue):
+                    pass
+        finally:
+            if output_queue is not None:
+                output_queue.put(END_OF_STAGE)
+            self.stage_seconds[name] = time.perf_counter() - start
+
+    def _start_stage(self, name: str, stage, input_queue: queue.Queue = None,
+                     output_queue: queue.Queue = None) -> threading.Thread:
+        thread = threading.Thread(target=self._run_stage, name=f'pipeline-{name}',
+                                  args=(name, stage, input_queue, output_queue), daemon=True)
+        thread.start()
+        return thread
+
+    def run(self, output_file_path: str = 'related_persons_info.txt') -> bool:
+        """
+        Reads, filters and matches the persons of the input file and writes the related persons to the output file
+
+        :param output_file_path: string  path of the output txt file
+        :return: boolean
+        True if every stage succeeded
+        """
+        records_queue = queue.Queue(maxsize=self.queue_size)
+        items_queue = queue.Queue(maxsize=self.queue_size)
+        lines_queue = queue.Queue(maxsize=self.queue_size)
+        filter_fields = FilterFields(name_normaliser=self.name_normaliser)
+        query = RelatedPersonsQuery(items=[], name_normaliser=self.name_normaliser)
+        query.build_index()
+
+        def read():
+            records = GetFirstNRecordsFromCSVFile().read_data_from_csv(file_path=self.input_file_path)
+            for batch in self.iter_batches(islice(records, self.count)):
+                records_queue.put(batch)
+
+        def validate():
+            if not self.validator_processes:
+                for batch in self.iter_queue(records_queue):
+                    items_queue.put([row[0:2] for row in batch if filter_fields.get_first_failing_rule(row) is None])
+                return
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=self.validator_processes, initializer=_init_validator_worker,
+                                     initargs=(self.name_normaliser,)) as executor:
+                # Batches are validated in parallel and passed on in input order
+                pending = deque()
+                for batch in self.iter_queue(records_queue):
+                    pending.append(executor.submit(_validate_batch, batch))
+                    if len(pending) > self.queue_size:
+                        items_queue.put(pending.popleft().result())
+                while pending:
+                    items_queue.put(pending.popleft().result())
+
+        def index():
+            for batch in self.iter_queue(items_queue):
+                for item in batch:
+                    query.add_person(first_name=item[0], last_name=item[1])
+
+        def match():
+            related_names_items = query.iter_related_names_items()
+            lines = FormatAndWriteRelatedNamesToAFile.build_format_for_related_names(related_names_items)
+            for batch in self.iter_batches(lines):
+                lines_queue.put(batch)
+
+        def write():
+            with open(output_file_path, 'w') as output_file:
+                for batch in self.iter_queue(lines_queue):
+                    output_file.writelines(batch)
+
+        stages = [self._start_stage('read', read, output_queue=records_queue),
+                  self._start_stage('validate', validate, input_queue=records_queue, output_queue=items_queue),
+                  self._start_stage('index', index, input_queue=items_queue)]
+        for thread in stages:
+            thread.join()
+        writer = self._start_stage('write', write, input_queue=lines_queue)
+        if not self.errors:
+            self._run_stage('match', match, output_queue=lines_queue)
+        else:
+            lines_queue.put(END_OF_STAGE)
+        writer.join()
+
+        if self.errors:
+            self.log.error(msg=f'Pipeline failed in {", ".join(name for name, _ in self.errors)} stage')
+            return False
+        stage_times = ', '.join(f'{name} {seconds:.3f}s' for name, seconds in self.stage_seconds.items())
+        self.log.info(msg=f'Pipeline indexed {len(query.names)} persons, stage times: {stage_times}')
+        self.log.info(msg="Check out the output file for Related Persons details")
+        return True
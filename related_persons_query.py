@@ -0,0 +1,244 @@
+import heapq
+from itertools import islice
+from utils.customLogger import LazyLogger
+import logging
+from filter_fields import FilterFields
+from get_related_persons import GetRelatedPersons
+
+
+# Answers selective related persons queries without building related names of every person
+class RelatedPersonsQuery:
+    """
+    RelatedPersonsQuery class indexes the persons by their last name tokens (parts of a hyphenated last name)
+    and answers queries like "persons related to X", "the largest families" or "everyone sharing a token".
+    Two persons are related when their last names share at least one token, same as in GetRelatedPersons.
+    Only the index is built upfront, the related names are computed for the queried persons only.
+    With a hub_threshold, tokens shared by more persons than the threshold are hub families: they are not expanded
+    into pairs of related persons, they are reported once per family with iter_hub_families instead
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, items: list = None, name_normaliser=None, hub_threshold: int = None):
+        """
+        :param items: list of items (received from 'get_filtered_first_lastname_details').
+        Each item is a list consisting of first_name, last_name.
+        When not given the items are read and filtered from the input file on the first query
+        :param name_normaliser: NameNormaliser  indexes normalised last name tokens when given
+        :param hub_threshold: int  persons sharing only tokens of families larger than this are not related,
+        every token is matched when not given
+        """
+        self.items = items
+        self.name_normaliser = name_normaliser
+        self.hub_threshold = hub_threshold
+        # Splits the last names of every person added, created once
+        self.last_name_splitter = GetRelatedPersons(name_normaliser=name_normaliser)
+        self.names = []
+        self.person_tokens = []
+        self.token_index = {}
+        self.name_index = {}
+        self._ordered_names = None
+        self._is_indexed = False
+
+    def add_person(self, first_name: str, last_name: str) -> int:
+        """
+        Adds a person to the index
+
+        :param first_name: string
+        :param last_name: string, ex: "William-Scott" or "William"
+        :return: int  id of the person i.e. position of the person in the input order
+        """
+        person_id = len(self.names)
+        name = ' '.join([first_name, last_name])
+        tokens = list(dict.fromkeys(self.last_name_splitter.get_last_name_tokens(last_name=last_name)))
+        self.names.append(name)
+        self.person_tokens.append(tokens)
+        for token in tokens:
+            self.token_index.setdefault(token, []).append(person_id)
+        self.name_index.setdefault(name, []).append(person_id)
+        self._ordered_names = None
+        return person_id
+
+    def build_index(self):
+        """
+        Builds the last name token index for all the items, once
+        """
+        if self._is_indexed:
+            return
+        if self.items is None:
+            self.items = FilterFields(name_normaliser=self.name_normaliser).get_filtered_first_lastname_details()
+        for item in self.items:
+            self.add_person(first_name=item[0], last_name=item[1])
+        self._is_indexed = True
+        self.log.info(msg=f'Indexed {len(self.names)} persons by {len(self.token_index)} last name tokens')
+        if self.hub_threshold is not None:
+            hub_families = list(self.iter_hub_families())
+            if hub_families:
+                token, size = hub_families[0]
+                self.log.info(msg=f'{len(hub_families)} hub families above {self.hub_threshold} persons '
+                                  f'have {sum(size for _, size in hub_families)} members and are not expanded, '
+                                  f'largest is {token} with {size} members')
+
+    def is_hub_token(self, token: str) -> bool:
+        """
+        :param token: string  last name or a part of hyphenated last name
+        :return: boolean
+        True if more persons than hub_threshold have the token
+        """
+        return self.hub_threshold is not None and len(self.token_index[token]) > self.hub_threshold
+
+    def get_matching_tokens(self, person_id: int) -> list:
+        """
+        :param person_id: int
+        :return: list of the tokens of the person other than hub family tokens
+        """
+        if self.hub_threshold is None:
+            return self.person_tokens[person_id]
+        return [token for token in self.person_tokens[person_id] if not self.is_hub_token(token)]
+
+    def iter_hub_families(self):
+        """
+        Generator function which returns the hub families, largest first
+
+        :return: tuple (token, number of persons having the token)
+        """
+        self.build_index()
+        if self.hub_threshold is None:
+            return
+        hub_families = [(len(ids), token) for token, ids in self.token_index.items() if len(ids) > self.hub_threshold]
+        for size, token in sorted(hub_families, reverse=True):
+            yield token, size
+
+    def iter_related_ids(self, person_id: int):
+        """
+        Generator function which returns ids of the persons related to the given person in input order
+
+        :param person_id: int
+        :return: int
+        """
+        previous = None
+        for other_id in heapq.merge(*[self.token_index[token] for token in self.get_matching_tokens(person_id)]):
+            if other_id != person_id and other_id != previous:
+                yield other_id
+            previous = other_id
+
+    def _get_first_seen_position(self, name: str) -> tuple:
+        """
+        Gets the position at which GetRelatedPersons.get_related_names_data first adds the name as a key.
+        A person is added when it is compared as the first item or when an earlier person matches with it
+
+        :param name: string  first_name, last_name of a person
+        :return: tuple (position of first item, position of second item)
+        """
+        positions = []
+        for person_id in self.name_index[name]:
+            first_related = [ids[0] if ids[0] != person_id else ids[1]
+                             for ids in (self.token_index[token] for token in self.get_matching_tokens(person_id))
+                             if len(ids) > 1]
+            if first_related and min(first_related) < person_id:
+                positions.append((min(first_related), person_id))
+            else:
+                positions.append((person_id, -1))
+        return min(positions)
+
+    def _has_related_persons(self, name: str) -> bool:
+        """
+        :param name: string  first_name, last_name of a person
+        :return: boolean
+        True if any person with the name shares a last name token with another person
+        """
+        return any(len(self.token_index[token]) > 1
+                   for person_id in self.name_index[name] for token in self.get_matching_tokens(person_id))
+
+    def iter_related_names(self):
+        """
+        Generator function which returns the names having related persons,
+        in the same order as the keys of GetRelatedPersons.get_related_names_data
+
+        :return: string  first_name, last_name of a person
+        """
+        self.build_index()
+        if self._ordered_names is None:
+            self._ordered_names = sorted((name for name in self.name_index if self._has_related_persons(name)),
+                                         key=self._get_first_seen_position)
+        yield from self._ordered_names
+
+    def get_related_names(self, name: str) -> list:
+        """
+        Gets the persons related to a person, in the same order as GetRelatedPersons.get_related_names_data
+        When more than one person has the same name, their related persons are merged like in a dictionary key
+
+        :param name: string  first_name, last_name of a person, ex: "Tom William"
+        :return: list of names of related persons. Empty list when the name is unknown or has no related persons
+        """
+        self.build_index()
+        person_ids = self.name_index.get(name, [])
+        if len(person_ids) == 1:
+            return [self.names[other_id] for other_id in self.iter_related_ids(person_ids[0])]
+        matched_pairs = []
+        for person_id in person_ids:
+            for other_id in self.iter_related_ids(person_id):
+                matched_pairs.append(((min(person_id, other_id), max(person_id, other_id)), self.names[other_id]))
+        matched_pairs.sort(key=lambda matched_pair: matched_pair[0])
+        return [other_name for _, other_name in matched_pairs]
+
+    def iter_related_names_items(self):
+        """
+        Generator function which returns (name, related names) pairs lazily,
+        in the same order as GetRelatedPersons.get_related_names_data
+
+        :return: tuple (string, list)
+        """
+        for name in self.iter_related_names():
+            yield name, self.get_related_names(name=name)
+
+    def get_related_names_data(self, names: list = None) -> dict:
+        """
+        Gets the related names of the given persons, or of all the persons when names are not given
+
+        :param names: list of names of persons, ex: ["Tom William"]
+        :return: dict with the values having last name matching with the last name in the respective key.
+        Same as GetRelatedPersons.get_related_names_data when names are not given
+        """
+        if names is None:
+            return dict(self.iter_related_names_items())
+        related_names_data = {}
+        for name in names:
+            related_names = self.get_related_names(name=name)
+            if related_names:
+                related_names_data[name] = related_names
+        return related_names_data
+
+    def get_related_names_page(self, page_number: int, page_size: int) -> dict:
+        """
+        Gets one page of related names data. Only the persons on the page are matched
+
+        :param page_number: int  starts from 1
+        :param page_size: int  maximum number of persons in the page
+        :return: dict  same as get_related_names_data, for the persons on the page only
+        """
+        start = (page_number - 1) * page_size
+        names = list(islice(self.iter_related_names(), start, start + page_size))
+        return {name: self.get_related_names(name=name) for name in names}
+
+    def iter_persons_with_token(self, token: str):
+        """
+        Generator function which returns the names of everyone having the token in their last name
+
+        :param token: string  last name or a part of hyphenated last name, ex: "William"
+        :return: string  first_name, last_name of a person
+        """
+        self.build_index()
+        for person_id in self.token_index.get(token, []):
+            yield self.names[person_id]
+
+    def get_top_k_families(self, k: int) -> list:
+        """
+        Gets the largest families i.e. the last name tokens shared by the most persons
+
+        :param k: int  number of families
+        :return: list of tuples (token, number of persons having the token), largest first
+        """
+        self.build_index()
+        families = heapq.nlargest(k, ((len(ids), token) for token, ids in self.token_index.items() if len(ids) > 1))
+        return [(token, size) for size, token in families]
@@ -0,0 +1,219 @@
+import sqlite3
+from itertools import groupby, islice
+from utils.customLogger import LazyLogger
+import logging
+from get_related_persons import GetRelatedPersons
+
+
+# Stores filtered persons and their last name tokens in SQLite and answers related persons queries with indexed joins
+class RelatedPersonsStore:
+    """
+    RelatedPersonsStore class bulk loads the filtered persons and their last name tokens into a local SQLite database.
+    Two persons are related when they share a last name token, same as in GetRelatedPersons,
+    related persons are found by joining the token table on its token index instead of comparing names in Python.
+    The related persons txt file is one export of the store
+
+    Usage:
+        with RelatedPersonsStore('related_persons.db') as store:
+            store.load_persons(items=FilterFields().get_filtered_first_lastname_details())
+            store.get_related_names('Tom William')
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS persons (
+            id INTEGER PRIMARY KEY,
+            first_name TEXT NOT NULL,
+            last_name TEXT NOT NULL,
+            name TEXT NOT NULL,
+            source TEXT
+        );
+        CREATE TABLE IF NOT EXISTS last_name_tokens (
+            token TEXT NOT NULL,
+            person_id INTEGER NOT NULL REFERENCES persons (id),
+            PRIMARY KEY (token, person_id)
+        ) WITHOUT ROWID;
+    """
+    # Built after bulk loading, faster than updating them row by row
+    INDEXES = """
+        CREATE INDEX IF NOT EXISTS last_name_tokens_person_id ON last_name_tokens (person_id, token);
+        CREATE INDEX IF NOT EXISTS persons_name ON persons (name);
+    """
+    RELATED_PERSONS = """
+        SELECT DISTINCT other.id, other.name
+        FROM last_name_tokens AS token
+        JOIN last_name_tokens AS other_token ON other_token.token = token.token
+            AND other_token.person_id != token.person_id
+        JOIN persons AS other ON other.id = other_token.person_id
+        WHERE token.person_id = ?
+        ORDER BY other.id
+    """
+    # Names in the order GetRelatedPersons.get_related_names_data first adds them as keys, same as
+    # RelatedPersonsQuery._get_first_seen_position: a person is added when it is compared as the first item
+    # or when an earlier person matches with it, a name by the first of its persons to be added.
+    # Related persons of a name are ordered by the matched pair, persons with the same name match each other
+    ALL_RELATED_PERSONS = """
+        WITH related AS (
+            SELECT DISTINCT token.person_id, other_token.person_id AS other_id
+            FROM last_name_tokens AS token
+            JOIN last_name_tokens AS other_token ON other_token.token = token.token
+                AND other_token.person_id != token.person_id
+        ), person_related AS (
+            SELECT related.person_id, related.other_id, persons.name,
+                MIN(related.other_id) OVER (PARTITION BY related.person_id) AS first_other_id
+            FROM related JOIN persons ON persons.id = related.person_id
+        ), person_first_seen AS (
+            SELECT person_id, other_id, name, MIN(first_other_id, person_id) AS first_item,
+                CASE WHEN first_other_id < person_id THEN person_id ELSE -1 END AS second_item
+            FROM person_related
+        ), name_first_item AS (
+            SELECT *, MIN(first_item) OVER (PARTITION BY name) AS name_first_item
+            FROM person_first_seen
+        ), name_first_seen AS (
+            SELECT *, MIN(CASE WHEN first_item = name_first_item THEN second_item END)
+                OVER (PARTITION BY name) AS name_second_item
+            FROM name_first_item
+        )
+        SELECT name_first_seen.name, other.name
+        FROM name_first_seen
+        JOIN persons AS other ON other.id = name_first_seen.other_id
+        ORDER BY name_first_seen.name_first_item, name_first_seen.name_second_item,
+            MIN(name_first_seen.person_id, name_first_seen.other_id),
+            MAX(name_first_seen.person_id, name_first_seen.other_id)
+    """
+
+    def __init__(self, db_path: str = 'related_persons.db', batch_size: int = 10000, name_normaliser=None):
+        """
+        :param db_path: string  path of the SQLite database file, created when missing
+        :param batch_size: int  number of rows inserted with one executemany
+        :param name_normaliser: NameNormaliser  stores normalised last name tokens when given
+        """
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.name_normaliser = name_normaliser
+        self.connection = sqlite3.connect(db_path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(self.SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def clear(self):
+        """
+        Deletes all the persons and tokens
+        """
+        with self.connection:
+            self.connection.execute('DELETE FROM last_name_tokens')
+            self.connection.execute('DELETE FROM persons')
+
+    def load_persons(self, items: list, source: str = None, build_indexes: bool = True) -> int:
+        """
+        Bulk loads persons and their last name tokens in batches, in one transaction.
+        Persons get ids after the persons already in the store, in input order.
+        Loading into an empty store drops the indexes first, they are built again by build_indexes
+
+        :param items: list of items (received from 'get_filtered_first_lastname_details').
+        Each item is a list consisting of first_name, last_name
+        :param source: string  source of the persons, ex: input file path
+        :param build_indexes: bool  builds the indexes after loading. False when loading many sources one after another,
+        build_indexes is then called once after the last one
+        :return: int  number of persons loaded
+        """
+        splitter = GetRelatedPersons(name_normaliser=self.name_normaliser)
+        next_id = self.connection.execute('SELECT COALESCE(MAX(id), -1) + 1 FROM persons').fetchone()[0]
+        items = iter(items)
+        loaded = 0
+        with self.connection:
+            if next_id == 0:
+                self.connection.execute('DROP INDEX IF EXISTS last_name_tokens_person_id')
+                self.connection.execute('DROP INDEX IF EXISTS persons_name')
+            while True:
+                batch = list(islice(items, self.batch_size))
+                if not batch:
+                    break
+                persons = []
+                tokens = []
+                for person_id, (first_name, last_name) in enumerate(batch, start=next_id + loaded):
+                    persons.append((person_id, first_name, last_name, ' '.join([first_name, last_name]), source))
+                    tokens.extend((token, person_id)
+                                  for token in dict.fromkeys(splitter.get_last_name_tokens(last_name=last_name)))
+                self.connection.executemany('INSERT INTO persons VALUES (?, ?, ?, ?, ?)', persons)
+                self.connection.executemany('INSERT INTO last_name_tokens VALUES (?, ?)', tokens)
+                loaded += len(batch)
+        self.log.info(msg=f'Loaded {loaded} persons into {self.db_path}')
+        if build_indexes:
+            self.build_indexes()
+        return loaded
+
+    def build_indexes(self):
+        """
+        Builds the indexes missing after bulk loading and updates the query planner statistics
+        """
+        self.connection.executescript(self.INDEXES)
+        self.connection.execute('ANALYZE')
+
+    def get_person_ids(self, name: str) -> list:
+        """
+        :param name: string  first_name, last_name of a person, ex: "Tom William"
+        :return: list of ids of the persons with the name
+        """
+        return [row[0] for row in self.connection.execute('SELECT id FROM persons WHERE name = ? ORDER BY id', (name,))]
+
+    def get_related_names(self, name: str) -> list:
+        """
+        Gets the persons related to a person, in the same order as GetRelatedPersons.get_related_names_data
+        When more than one person has the same name, their related persons are merged like in a dictionary key
+
+        :param name: string  first_name, last_name of a person, ex: "Tom William"
+        :return: list of names of related persons. Empty list when the name is unknown or has no related persons
+        """
+        matched_pairs = []
+        for person_id in self.get_person_ids(name=name):
+            for other_id, other_name in self.connection.execute(self.RELATED_PERSONS, (person_id,)):
+                matched_pairs.append(((min(person_id, other_id), max(person_id, other_id)), other_name))
+        matched_pairs.sort(key=lambda matched_pair: matched_pair[0])
+        return [other_name for _, other_name in matched_pairs]
+
+    def iter_related_names_items(self):
+        """
+        Generator function which returns (name, related names) pairs streamed from one query,
+        in the same order as GetRelatedPersons.get_related_names_data.
+        Persons with the same name are returned as one pair, same as get_related_names
+
+        :return: tuple (string, list)
+        """
+        rows = self.connection.execute(self.ALL_RELATED_PERSONS)
+        for name, related_rows in groupby(rows, key=lambda row: row[0]):
+            yield name, [other_name for _, other_name in related_rows]
+
+    def iter_persons_with_token(self, token: str):
+        """
+        Generator function which returns the names of everyone having the token in their last name
+
+        :param token: string  last name or a part of hyphenated last name, ex: "William"
+        :return: string  first_name, last_name of a person
+        """
+        rows = self.connection.execute("""
+            SELECT persons.name FROM last_name_tokens JOIN persons ON persons.id = last_name_tokens.person_id
+            WHERE last_name_tokens.token = ? ORDER BY persons.id""", (token,))
+        for row in rows:
+            yield row[0]
+
+    def get_top_k_families(self, k: int) -> list:
+        """
+        Gets the largest families i.e. the last name tokens shared by the most persons
+
+        :param k: int  number of families
+        :return: list of tuples (token, number of persons having the token), largest first
+        """
+        return self.connection.execute("""
+            SELECT token, COUNT(*) AS size FROM last_name_tokens GROUP BY token HAVING size > 1
+            ORDER BY size DESC, token DESC LIMIT ?""", (k,)).fetchall()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from utils.customLogger import LazyLogger
+import logging
+
+
+# Stores the results of runs on disk to serve repeated runs on unchanged input
+class ResultCache:
+    """
+    ResultCache class keeps the output txt files of earlier runs in a cache directory.
+    The entries are keyed by a content fingerprint of the input files plus the filter and match configuration,
+    so a run on unchanged input with the same settings is served from disk.
+    The entries are evicted by age and then least recently used first when the cache is over its size cap
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    FINGERPRINTS_FILE = 'fingerprints.json'
+
+    def __init__(self, cache_dir: str = './.related_persons_cache', max_size_bytes: int = 100 * 1024 * 1024,
+                 max_age_seconds: float = 7 * 24 * 3600):
+        """
+        :param cache_dir: string  directory of the cache entries, created when missing
+        :param max_size_bytes: int  maximum total size of the cache entries
+        :param max_age_seconds: float  entries not used for longer than this are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def get_file_fingerprint(self, file_path: str) -> str:
+        """
+        Gets sha256 of the file content. The fingerprint is remembered with the size and modification time
+        of the file, an unchanged file is not read again
+
+        :param file_path: string
+        :return: string  hex digest
+        """
+        fingerprints_path = os.path.join(self.cache_dir, self.FINGERPRINTS_FILE)
+        try:
+            with open(fingerprints_path) as fingerprints_file:
+                fingerprints = json.load(fingerprints_file)
+        except (IOError, ValueError):
+            fingerprints = {}
+        file_stat = os.stat(file_path)
+        file_key = f'{os.path.abspath(file_path)}:{file_stat.st_size}:{file_stat.st_mtime_ns}'
+        if file_key in fingerprints:
+            return fingerprints[file_key]
+
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as input_file:
+            for chunk in iter(lambda: input_file.read(1 << 20), b''):
+                digest.update(chunk)
+        fingerprints = {k: v for k, v in fingerprints.items()
+                        if not k.startswith(f'{os.path.abspath(file_path)}:')}
+        fingerprints[file_key] = digest.hexdigest()
+        self._write_atomically(fingerprints_path, json.dumps(fingerprints).encode())
+        return fingerprints[file_key]
+
+    def get_key(self, file_paths: list, configuration: dict) -> str:
+        """
+        :param file_paths: list of input file paths, in input order
+        :param configuration: dict of settings changing the result, ex: {"record_count": 1000}
+        :return: string  cache key. None when an input file can not be read
+        """
+        try:
+            key_data = {'inputs': [self.get_file_fingerprint(file_path) for file_path in file_paths],
+                        'configuration': configuration}
+        except IOError:
+            self.log.error(msg='Unable to access input data file for result cache')
+            return None
+        return hashlib.sha256(json.dumps(key_data, sort_keys=True).encode()).hexdigest()
+
+    def _get_entry_path(self, key: str, extension: str) -> str:
+        return os.path.join(self.cache_dir, f'{key}.{extension}')
+
+    def _get_fresh_entry_path(self, key: str, extension: str) -> str:
+        """
+        :return: string  path of the entry, None when missing or too old. Using an entry refreshes it
+        """
+        entry_path = self._get_entry_path(key, extension)
+        try:
+            if time.time() - os.path.getmtime(entry_path) > self.max_age_seconds:
+                return None
+            os.utime(entry_path)
+            return entry_path
+        except OSError:
+            return None
+
+    @staticmethod
+    def _write_atomically(file_path: str, content: bytes):
+        temp_path = f'{file_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'wb') as temp_file:
+            temp_file.write(content)
+        os.replace(temp_path, file_path)
+
+    def copy_cached_output(self, key: str, output_file_path: str) -> bool:
+        """
+        Copies the output txt file of an earlier run
+
+        :param key: string  cache key
+        :param output_file_path: string  path of the output txt file
+        :return: boolean
+        True if the output was served from the cache
+        """
+        entry_path = self._get_fresh_entry_path(key, 'txt')
+        if entry_path is None:
+            return False
+        shutil.copyfile(entry_path, output_file_path)
+        self.log.info(msg=f'Served {output_file_path} from result cache')
+        return True
+
+    def store_output(self, key: str, output_file_path: str):
+        """
+        :param key: string  cache key
+        :param output_file_path: string  path of the output txt file of this run
+        """
+        temp_path = f'{self._get_entry_path(key, "txt")}.{os.getpid()}.tmp'
+        shutil.copyfile(output_file_path, temp_path)
+        os.replace(temp_path, self._get_entry_path(key, 'txt'))
+        self.evict()
+
+    def evict(self):
+        """
+        Removes the entries older than the maximum age,
+        then the least recently used entries until the cache is within its size cap
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name == self.FINGERPRINTS_FILE or entry.name.endswith('.tmp'):
+                continue
+            entry_stat = entry.stat()
+            entries.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        now = time.time()
+        evicted = 0
+        for modified_time, size, entry_path in entries:
+            if now - modified_time <= self.max_age_seconds and total_size <= self.max_size_bytes:
+                break
+            os.remove(entry_path)
+            total_size -= size
+            evicted += 1
+        if evicted:
+            self.log.info(msg=f'Evicted {evicted} result cache entries')
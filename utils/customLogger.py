@@ -1,17 +1,18 @@
 import logging
-import inspect
+import sys
 
 
-def custom_logger(log_level=logging.DEBUG):
+def custom_logger(log_level=logging.DEBUG, logger_name: str = None):
     # step1: Create Logger object and set level
     '''
-    fileName = inspect.stack()[1][1]
-    line = inspect.stack()[1][2]
-    method = inspect.stack()[1][3]
+    logger_name defaults to the name of the calling function or class body
     '''
-    logger_name = inspect.stack()[1][3]
+    if logger_name is None:
+        logger_name = sys._getframe(1).f_code.co_name
     logger = logging.getLogger(name=logger_name)  # Log record object
     logger.setLevel(logging.DEBUG)
+    if logger.handlers:  # Same logger is shared by classes with the same name
+        return logger
 
     # step2: Create Handler(console here) and set its log level
     console_handler = logging.StreamHandler()
@@ -26,3 +27,27 @@ def custom_logger(log_level=logging.DEBUG):
     logger.addHandler(console_handler)
 
     return logger
+
+
+class LazyLogger:
+    """
+    Class attribute which creates the custom logger of a class on first use, named after the class.
+    Importing a module does not create the loggers of its classes
+
+    Usage:
+        class FilterFields:
+            log = LazyLogger(log_level=logging.INFO)
+    """
+
+    def __init__(self, log_level=logging.DEBUG):
+        self.log_level = log_level
+        self.logger_name = None
+        self.logger = None
+
+    def __set_name__(self, owner, name):
+        self.logger_name = owner.__name__
+
+    def __get__(self, instance, owner):
+        if self.logger is None:
+            self.logger = custom_logger(log_level=self.log_level, logger_name=self.logger_name)
+        return self.logger
@@ -0,0 +1,84 @@
+import logging
+import time
+from utils.customLogger import LazyLogger
+
+
+class ProgressReporter:
+    """
+    Logs the progress of a long stage at most once per interval, with rows per second and an ETA.
+    Progress is measured in any unit with a known total, ex: bytes of the input file read,
+    rows are counted separately for the rate. Only the work done since start counts for the rate,
+    so a resumed run does not report the work of an earlier run as its own
+
+    Usage:
+        progress = ProgressReporter(name='read', total=os.path.getsize(file_path))
+        progress.start(position=offset, rows=records_read)
+        progress.update(position=offset, rows=records_read)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, name: str, total: int = None, interval_seconds: float = 10.0):
+        """
+        :param name: string  name of the stage in the log lines
+        :param total: int  position at which the stage is complete, no ETA is reported when not given
+        :param interval_seconds: float  minimum seconds between two log lines
+        """
+        self.name = name
+        self.total = total
+        self.interval_seconds = interval_seconds
+        self.start_time = self.last_report_time = time.monotonic()
+        self.start_position = self.start_rows = 0
+
+    def start(self, position: int = 0, rows: int = 0):
+        """
+        :param position: int  progress already made, ex: offset of a resumed read
+        :param rows: int  rows already processed
+        """
+        self.start_time = self.last_report_time = time.monotonic()
+        self.start_position = position
+        self.start_rows = rows
+
+    @staticmethod
+    def format_seconds(seconds: float) -> str:
+        """
+        :param seconds: float
+        :return: string, ex: "1:02:03"
+        """
+        minutes, seconds = divmod(int(seconds), 60)
+        hours, minutes = divmod(minutes, 60)
+        return f'{hours}:{minutes:02d}:{seconds:02d}'
+
+    def get_progress(self, position: int, rows: int) -> str:
+        """
+        :param position: int  progress made so far
+        :param rows: int  rows processed so far
+        :return: string, ex: "read: 120000 rows, 40000 rows/s, 30.0%, ETA 0:00:07"
+        """
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        progress = f'{self.name}: {rows} rows, {(rows - self.start_rows) / elapsed:.0f} rows/s'
+        if self.total:
+            progress += f', {100 * position / self.total:.1f}%'
+            position_rate = (position - self.start_position) / elapsed
+            if position_rate > 0:
+                progress += f', ETA {self.format_seconds((self.total - position) / position_rate)}'
+        return progress
+
+    def update(self, position: int, rows: int):
+        """
+        Logs the progress when the interval has passed since the last log line
+
+        :param position: int  progress made so far
+        :param rows: int  rows processed so far
+        """
+        now = time.monotonic()
+        if now - self.last_report_time >= self.interval_seconds:
+            self.last_report_time = now
+            self.log.info(msg=self.get_progress(position=position, rows=rows))
+
+    def finish(self, rows: int):
+        """
+        :param rows: int  rows processed in total
+        """
+        elapsed = time.monotonic() - self.start_time
+        self.log.info(msg=f'{self.name}: completed {rows} rows in {self.format_seconds(elapsed)}')
@@ -0,0 +1,118 @@
+import logging
+import os
+import sys
+from contextlib import contextmanager, nullcontext
+from utils.customLogger import LazyLogger
+
+
+class StageProfiler:
+    """
+    Profiles the stages of a run (read, filter, match, write) when an output directory is given.
+    For every stage it writes to the output directory:
+        <stage>.pstats       cProfile statistics, open with 'python -m pstats'
+        <stage>.collapsed    sampled call stacks in collapsed format, input of flamegraph.pl or speedscope
+        <stage>.allocations  top allocation sites of the stage, difference of tracemalloc snapshots at its start and end
+    Without an output directory the stages run as they are, profiling modules are not even imported
+
+    Usage:
+        profiler = StageProfiler(output_dir='./profile')
+        with profiler.stage('match'):
+            related_names_data = GetRelatedPersons().get_related_names_data(items=items)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, output_dir: str = None, sample_interval: float = 0.01, top_allocations: int = 25,
+                 traceback_frames: int = 1):
+        """
+        :param output_dir: string  directory of the profiling results, profiling is off when not given
+        :param sample_interval: float  seconds between two call stack samples
+        :param top_allocations: int  number of allocation sites reported per stage
+        :param traceback_frames: int  frames tracemalloc stores per allocation, allocation sites only need one.
+        Every extra frame slows down the profiled stage
+        """
+        self.output_dir = output_dir
+        self.sample_interval = sample_interval
+        self.top_allocations = top_allocations
+        self.traceback_frames = traceback_frames
+
+    @property
+    def enabled(self) -> bool:
+        return self.output_dir is not None
+
+    def stage(self, name: str):
+        """
+        :param name: string  name of the stage, used in the result file names
+        :return: context manager profiling the code run inside it. Stages can not be nested
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._profile_stage(name)
+
+    @staticmethod
+    def get_collapsed_stack(frame) -> str:
+        """
+        :param frame: frame object, innermost frame of a call stack
+        :return: string  frames from outermost to innermost separated by ';', ex: "<module> (a.py:1);main (a.py:5)"
+        """
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    @contextmanager
+    def _profile_stage(self, name: str):
+        import cProfile
+        import threading
+        import tracemalloc
+        from collections import Counter
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        thread_id = threading.get_ident()
+        stacks = Counter()
+        stop_sampling = threading.Event()
+
+        def sample_stacks():
+            while not stop_sampling.wait(self.sample_interval):
+                frame = sys._current_frames().get(thread_id)
+                if frame is not None:
+                    stacks[self.get_collapsed_stack(frame)] += 1
+
+        sampler = threading.Thread(target=sample_stacks, name=f'{name}-sampler', daemon=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(self.traceback_frames)
+        start_snapshot = tracemalloc.take_snapshot()
+        profile = cProfile.Profile()
+        sampler.start()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            stop_sampling.set()
+            sampler.join()
+            snapshot = tracemalloc.take_snapshot()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            self._write_stage_results(name=name, profile=profile, stacks=stacks, snapshot=snapshot,
+                                      start_snapshot=start_snapshot)
+            self.log.info(msg=f'Profiled {name} stage: {sum(stacks.values())} samples, '
+                              f'peak traced memory {peak_memory / 1024:.0f} KiB, results in {self.output_dir}')
+
+    def _write_stage_results(self, name: str, profile, stacks, snapshot, start_snapshot):
+        import tracemalloc
+
+        path = os.path.join(self.output_dir, name)
+        profile.dump_stats(f'{path}.pstats')
+        with open(f'{path}.collapsed', 'w') as collapsed_file:
+            for stack, count in stacks.most_common():
+                collapsed_file.write(f'{stack} {count}\n')
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+        statistics = snapshot.filter_traces(filters).compare_to(start_snapshot.filter_traces(filters), 'lineno')
+        with open(f'{path}.allocations', 'w') as allocations_file:
+            for statistic in statistics[:self.top_allocations]:
+                allocations_file.write(f'{statistic}\n')
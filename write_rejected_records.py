@@ -0,0 +1,48 @@
+import csv
+from utils.customLogger import LazyLogger
+import logging
+
+
+# Writes the person records rejected by FilterFields rules to a csv file
+class RejectedRecordsWriter:
+    """
+    RejectedRecordsWriter class is a reject handler for FilterFields 'get_filtered_first_lastname_details_single_pass'.
+    Each rejected record is written with its line number in the input file and the first rule it fails,
+    followed by the original fields. Writes are buffered
+
+    Usage:
+        with RejectedRecordsWriter('rejected_persons.csv') as reject_handler:
+            FilterFields().get_filtered_first_lastname_details_single_pass(reject_handler=reject_handler)
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    def __init__(self, file_path: str, buffer_size: int = 1 << 20):
+        """
+        :param file_path: string  path of the reject csv file
+        :param buffer_size: int  bytes buffered before writing to the file
+        """
+        self.file_path = file_path
+        self.buffer_size = buffer_size
+        self.rejected_count = 0
+        self.reject_file = None
+        self.csv_writer = None
+
+    def __enter__(self):
+        self.reject_file = open(self.file_path, 'w', newline='', buffering=self.buffer_size)
+        self.csv_writer = csv.writer(self.reject_file)
+        self.csv_writer.writerow(['line_number', 'rule', 'fields'])
+        return self
+
+    def __call__(self, line_number: int, rule: str, row: list):
+        """
+        :param line_number: int  line number of the record in the input file
+        :param rule: string  first rule the record fails
+        :param row: list  person details as read from csv file
+        """
+        self.csv_writer.writerow([line_number, rule, *row])
+        self.rejected_count += 1
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reject_file.close()
+        self.log.info(msg=f'Wrote {self.rejected_count} rejected records to {self.file_path}')
@@ -0,0 +1,179 @@
+import ast
+import json
+import os
+import sys
+from array import array
+from utils.customLogger import LazyLogger
+import logging
+
+NPY_MAGIC = b'\x93NUMPY'
+# array typecodes of the little endian .npy dtypes used by the export
+NPY_TYPECODES = {'|u1': 'B', '<i4': next(code for code in 'il' if array(code).itemsize == 4),
+                 '<i8': next(code for code in 'lq' if array(code).itemsize == 8)}
+
+
+def write_npy(file_path: str, values: array, dtype: str):
+    """
+    Writes a one dimensional array in NumPy .npy format version 1.0, loadable with numpy.load(mmap_mode='r')
+
+    :param file_path: string  path of the .npy file
+    :param values: array.array  typecode matching the dtype
+    :param dtype: string  one of NPY_TYPECODES, ex: "<i4"
+    """
+    header = f"{{'descr': '{dtype}', 'fortran_order': False, 'shape': ({len(values)},), }}"
+    # magic, version, header length and header are padded to a multiple of 64 bytes
+    header = header + ' ' * (-(len(NPY_MAGIC) + 4 + len(header) + 1) % 64) + '\n'
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(file_path, 'wb') as npy_file:
+        npy_file.write(NPY_MAGIC + b'\x01\x00' + len(header).to_bytes(2, 'little') + header.encode('latin1'))
+        values.tofile(npy_file)
+
+
+def read_npy(file_path: str) -> array:
+    """
+    Reads a one dimensional .npy file written by write_npy
+
+    :param file_path: string  path of the .npy file
+    :return: array.array
+    """
+    with open(file_path, 'rb') as npy_file:
+        prefix = npy_file.read(len(NPY_MAGIC) + 4)
+        if prefix[:len(NPY_MAGIC)] != NPY_MAGIC:
+            raise ValueError(f'{file_path} is not a .npy file')
+        header = ast.literal_eval(npy_file.read(int.from_bytes(prefix[-2:], 'little')).decode('latin1'))
+        values = array(NPY_TYPECODES[header['descr']])
+        values.frombytes(npy_file.read())
+    if sys.byteorder == 'big' and values.itemsize > 1:
+        values.byteswap()
+    return values
+
+
+# Writes the persons and their relationships as a compact edge list of .npy arrays
+class RelatedPersonsGraphWriter:
+    """
+    RelatedPersonsGraphWriter class exports the relationship graph of a RelatedPersonsQuery to a directory of
+    .npy arrays described by manifest.json, for graph and analytics tools to load without parsing text.
+    Every relationship is written once as an edge (id_a, id_b, token_id) with id_a < id_b,
+    token_id is the first last name token of person id_a shared with person id_b.
+    Strings are stored as UTF-8 bytes with offsets, string i is data[offsets[i]:offsets[i + 1]]
+
+        manifest.json                   counts and dtype, shape of every array
+        person_name.offsets/.data.npy   first_name, last_name of the persons, id is the position
+        person_source.npy               source id of every person
+        source.offsets/.data.npy        source file paths
+        token.offsets/.data.npy         last name tokens, id is the position
+        edge_id_a/edge_id_b/edge_token_id.npy
+
+    Usage:
+        RelatedPersonsGraphWriter(query=RelatedPersonsQuery()).write(output_dir='./graph')
+        graph = RelatedPersonsGraphWriter.read(output_dir='./graph')
+    """
+
+    log = LazyLogger(log_level=logging.INFO)
+
+    MANIFEST_FILE = 'manifest.json'
+    FORMAT_VERSION = 1
+
+    def __init__(self, query, sources: list = None):
+        """
+        :param query: RelatedPersonsQuery  index of the persons
+        :param sources: list of source file path of every person, ex: GetRelatedPersonsAcrossFiles.sources
+        """
+        self.query = query
+        self.sources = sources
+
+    def iter_edges(self):
+        """
+        Generator function which returns every relationship once, ordered by id_a then id_b.
+        Hub family tokens of the query are left out, their members are listed once in the group file instead
+
+        :return: tuple (id_a, id_b, token_id)
+        """
+        token_ids = {token: token_id for token_id, token in enumerate(self.query.token_index)}
+        for person_id in range(len(self.query.person_tokens)):
+            shared_tokens = {}
+            for token in self.query.get_matching_tokens(person_id):
+                for other_id in self.query.token_index[token]:
+                    if other_id > person_id and other_id not in shared_tokens:
+                        shared_tokens[other_id] = token_ids[token]
+            for other_id in sorted(shared_tokens):
+                yield person_id, other_id, shared_tokens[other_id]
+
+    @staticmethod
+    def get_int_dtype(max_value: int) -> str:
+        return '<i4' if max_value < 1 << 31 else '<i8'
+
+    def _write_strings(self, output_dir: str, name: str, strings: list, arrays: dict):
+        data = bytearray()
+        offsets = [0]
+        for string in strings:
+            data += string.encode('utf-8')
+            offsets.append(len(data))
+        self._write_array(output_dir, f'{name}.offsets', offsets, self.get_int_dtype(len(data)), arrays)
+        self._write_array(output_dir, f'{name}.data', data, '|u1', arrays)
+
+    @staticmethod
+    def _write_array(output_dir: str, name: str, values, dtype: str, arrays: dict):
+        file_name = f'{name}.npy'
+        write_npy(os.path.join(output_dir, file_name), array(NPY_TYPECODES[dtype], values), dtype)
+        arrays[name] = {'file': file_name, 'dtype': dtype, 'shape': [len(values)]}
+
+    def write(self, output_dir: str):
+        """
+        Writes the person table, token table and edge list to the output directory, manifest.json last
+
+        :param output_dir: string  directory of the export, created when missing
+        """
+        self.query.build_index()
+        os.makedirs(output_dir, exist_ok=True)
+        person_count = len(self.query.names)
+        sources = self.sources if self.sources is not None else [None] * person_count
+        source_ids = {}
+        person_source = [source_ids.setdefault(source, len(source_ids)) for source in sources]
+        id_dtype = self.get_int_dtype(person_count)
+
+        edge_id_a, edge_id_b, edge_token_id = array('q'), array('q'), array('q')
+        for id_a, id_b, token_id in self.iter_edges():
+            edge_id_a.append(id_a)
+            edge_id_b.append(id_b)
+            edge_token_id.append(token_id)
+
+        arrays = {}
+        self._write_strings(output_dir, 'person_name', self.query.names, arrays)
+        self._write_array(output_dir, 'person_source', person_source, self.get_int_dtype(len(source_ids)), arrays)
+        self._write_strings(output_dir, 'source', [source or '' for source in source_ids], arrays)
+        self._write_strings(output_dir, 'token', list(self.query.token_index), arrays)
+        self._write_array(output_dir, 'edge_id_a', edge_id_a, id_dtype, arrays)
+        self._write_array(output_dir, 'edge_id_b', edge_id_b, id_dtype, arrays)
+        self._write_array(output_dir, 'edge_token_id', edge_token_id, self.get_int_dtype(len(self.query.token_index)),
+                          arrays)
+        manifest = {'format': 'related-persons-graph', 'version': self.FORMAT_VERSION, 'persons': person_count,
+                    'sources': len(source_ids), 'tokens': len(self.query.token_index), 'edges': len(edge_id_a),
+                    'hub_threshold': self.query.hub_threshold, 'arrays': arrays}
+        with open(os.path.join(output_dir, self.MANIFEST_FILE), 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        self.log.info(msg=f'Exported {person_count} persons and {len(edge_id_a)} relationships to {output_dir}')
+
+    @classmethod
+    def read(cls, output_dir: str) -> dict:
+        """
+        Loads an export written by write
+
+        :param output_dir: string  directory of the export
+        :return: dict with keys "person_name", "source", "token" (lists of strings) and
+        "person_source", "edge_id_a", "edge_id_b", "edge_token_id" (array.array)
+        """
+        with open(os.path.join(output_dir, cls.MANIFEST_FILE)) as manifest_file:
+            manifest = json.load(manifest_file)
+        if manifest.get('format') != 'related-persons-graph' or manifest.get('version') != cls.FORMAT_VERSION:
+            raise ValueError(f'{output_dir} is not a related persons graph export of version {cls.FORMAT_VERSION}')
+        arrays = {name: read_npy(os.path.join(output_dir, entry['file']))
+                  for name, entry in manifest['arrays'].items()}
+        graph = {}
+        for name in ('person_name', 'source', 'token'):
+            offsets, data = arrays.pop(f'{name}.offsets'), arrays.pop(f'{name}.data').tobytes()
+            graph[name] = [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        graph.update(arrays)
+        return graph